@@ -1,25 +1,42 @@
 """Cards API endpoints for creating and fetching card metadata."""
 import logging
 import json
-import io
+import concurrent.futures
+import functools
+import mimetypes
+import multiprocessing
+import os
+import random
+import re
+import struct
+import tempfile
+import time
+import traceback
 import zipfile
-from datetime import datetime, timezone
-from typing import List, Optional
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form
-from fastapi.responses import StreamingResponse
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple, Union
+from fastapi import APIRouter, BackgroundTasks, HTTPException, UploadFile, File, Form
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel
 from google.cloud import datastore, storage
-from PIL import Image, ImageDraw
+from google.cloud.exceptions import NotFound
+from cachetools import TTLCache
+import httpx
 import ulid
+import orjson
 import asyncio
+import gcs_snapshots
 import media_utils
+from yjs_sync import YjsSync
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 
 # Reference to the WebSocket server (will be set by server.py)
 yjs_server = None
+yjs_sync = None
 
 # Color palette with matching names (16 colors)
 PALETTE = [
@@ -41,8 +58,15 @@ PALETTE = [
     {"name": "Peach", "color": "#FFB88C"},
 ]
 
+# (name, color) pairs precomputed so hot paths unpack a tuple instead of
+# doing two dict lookups per pick
+PALETTE_PAIRS = tuple((p["name"], p["color"]) for p in PALETTE)
+
+# Hoisted so timestamping skips the module attribute lookup
+UTC = timezone.utc
+
 # Lorem ipsum sentences for random prompts
-LOREM_SENTENCES = [
+LOREM_SENTENCES = (
     "Lorem ipsum dolor sit amet, consectetur adipiscing elit.",
     "Sed do eiusmod tempor incididunt ut labore et dolore magna aliqua.",
     "Ut enim ad minim veniam, quis nostrud exercitation ullamco.",
@@ -58,20 +82,88 @@ LOREM_SENTENCES = [
     "Praesent sapien massa, convallis a pellentesque nec egestas.",
     "Quisque velit nisi, pretium ut lacinia in elementum.",
     "Cras ultricies ligula sed magna dictum porta curabitur.",
-]
+)
 
 # Datastore client (singleton)
 ds_client = None
 gcs_client = None
 bucket_name = None
+bucket = None
+
+# Maximum parallel GCS uploads when mirroring many cards at once
+GCS_MIRROR_CONCURRENCY = 16
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# Card colors that _generate_color_png can render; anything else gets the
+# placeholder gray, since a bad color must not fail a zip mid-stream
+HEX_COLOR_PATTERN = re.compile(r"#?[0-9A-Fa-f]{6}")
+FALLBACK_COLOR = "#CCCCCC"
+
+# Maximum parallel media downloads when zipping a column
+DOWNLOAD_CONCURRENCY = 8
+
+# HTTP client shared by column downloads (created on first use) so requests
+# reuse pooled keep-alive connections and TLS sessions
+http_client = None
+
+# GCS JSON API accepts at most 100 sub-requests per batch call
+GCS_BATCH_SIZE = 100
+
+# Blobs fetched per page when listing a prefix
+GCS_LIST_PAGE_SIZE = 1000
+
+# Thumbnailing is CPU-bound (decode + resize), so it runs in worker processes
+# rather than threads to use every core. Spawned (not forked) so children
+# don't inherit the gRPC/HTTP client threads; workers start on first use.
+_thumb_pool = concurrent.futures.ProcessPoolExecutor(
+    max_workers=os.cpu_count(),
+    mp_context=multiprocessing.get_context("spawn"),
+)
+
+# Upload size limits
+MAX_IMAGE_BYTES = 10 * 1024 * 1024
+MAX_VIDEO_BYTES = 100 * 1024 * 1024
+
+# Lifetime of signed direct-upload URLs
+SIGNED_UPLOAD_TTL = timedelta(minutes=15)
+
+# Datastore caps a commit at 500 mutations; smaller batches sent in
+# parallel pipeline the commit RPCs without hammering quotas
+DATASTORE_BATCH_SIZE = 250
+DATASTORE_BATCH_CONCURRENCY = 8
+
+# Hard per-call limit: 500 mutations per commit
+DATASTORE_MAX_MUTATIONS = 500
+
+# Card lookups arriving within this window are coalesced into one get_multi
+CARD_LOADER_WINDOW = 0.005
+CARD_LOADER_MAX_BATCH = 500
+
+# Short-lived read caches so bursts of identical reads skip Datastore.
+# Writes in this module invalidate the affected card entries.
+_card_cache = TTLCache(maxsize=10000, ttl=5)  # cardId -> Card entity
+_shots_cache = TTLCache(maxsize=1000, ttl=2)  # sheetId -> {shotId: title}
+
+# Bumped on every card invalidation; a fetch only caches what it loaded if
+# no invalidation happened meanwhile, so a load racing an update can't put
+# the pre-update entity back
+_card_cache_epoch = 0
+
+
+def _invalidate_cards(*card_ids: str):
+    """Drop cards from the read cache after a write."""
+    global _card_cache_epoch
+    _card_cache_epoch += 1
+    for card_id in card_ids:
+        _card_cache.pop(card_id, None)
 
 
 def init_clients(gcs_bucket: str):
     """Initialize Datastore and GCS clients."""
-    global ds_client, gcs_client, bucket_name
+    global ds_client, gcs_client, bucket_name, bucket, yjs_sync
 
     # Log credentials being used
-    import os
     creds_path = os.getenv('GOOGLE_APPLICATION_CREDENTIALS')
     logger.info(f"GOOGLE_APPLICATION_CREDENTIALS: {creds_path}")
 
@@ -82,9 +174,169 @@ def init_clients(gcs_bucket: str):
 
     gcs_client = storage.Client(project='esproto')
     bucket_name = gcs_bucket
+    # Bucket handles are reusable; build it once instead of per request
+    bucket = gcs_client.bucket(gcs_bucket)
+    try:
+        # Loads uniform bucket-level access, which decides whether media
+        # uploads need a per-object ACL (media_utils.make_blob_public)
+        bucket.reload()
+    except Exception as e:
+        logger.warning(f"Could not load metadata for bucket {gcs_bucket}: {e}")
+    _card_key.cache_clear()
+    # yjs_server is assigned by server.py before startup calls init_clients
+    yjs_sync = YjsSync(yjs_server) if yjs_server is not None else None
     logger.info("Initialized Datastore and GCS clients for project: esproto")
 
 
+async def shutdown_clients():
+    """Stop the thumbnail worker processes and close the shared HTTP client."""
+    global http_client
+    _thumb_pool.shutdown(wait=False, cancel_futures=True)
+    if http_client is not None:
+        await http_client.aclose()
+        http_client = None
+
+
+def _get_http_client() -> httpx.AsyncClient:
+    """Return the shared HTTP client, creating it on first use."""
+    global http_client
+    if http_client is None:
+        http_client = httpx.AsyncClient(
+            timeout=30.0,
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=32),
+        )
+    return http_client
+
+
+@functools.lru_cache(maxsize=100000)
+def _card_key(card_id: str) -> datastore.Key:
+    """
+    Return the (memoized) Datastore key for a card.
+
+    Card IDs are re-requested constantly by the batch fetch and update
+    endpoints, so building and validating a Key for each one is wasted
+    work. The cache is cleared whenever init_clients replaces ds_client.
+
+    Args:
+        card_id: Card identifier
+
+    Returns:
+        datastore.Key: Key for the Card entity
+    """
+    return ds_client.key("Card", card_id)
+
+
+def _delete_blob_batch(blobs: list) -> None:
+    """
+    Delete up to GCS_BATCH_SIZE blobs in a single batched HTTP request.
+
+    Blobs that are already gone are ignored.
+
+    Args:
+        blobs: Blob objects to delete
+    """
+    with gcs_client.batch(raise_exception=False):
+        for blob in blobs:
+            blob.delete()
+
+
+def _mirror_card_to_gcs(card_id: str, card_data: dict):
+    """
+    Mirror card metadata to GCS as JSON (best effort).
+
+    Runs as a background task after the response has been sent, so GCS
+    latency never lands on the request path.
+
+    Args:
+        card_id: Card identifier
+        card_data: Card fields to serialize
+    """
+    try:
+        blob = bucket.blob(f"cards/{card_id}.json")
+        # Set on the blob so it goes out with the upload, not as a later patch
+        blob.cache_control = "no-store"
+        blob.upload_from_string(orjson.dumps(card_data), content_type="application/json")
+    except Exception as e:
+        logger.warning(f"Failed to mirror card to GCS: {e}")
+
+
+async def _mirror_cards_to_gcs(cards: List[dict], concurrency: int = GCS_MIRROR_CONCURRENCY):
+    """
+    Mirror many cards to GCS concurrently (best effort).
+
+    Each upload is a small single-request JSON PUT, so running several in
+    parallel threads is much faster than uploading them one after another.
+
+    Args:
+        cards: Card dicts, each containing at least "cardId"
+        concurrency: Maximum number of uploads in flight
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def mirror(card_data: dict):
+        async with semaphore:
+            await asyncio.to_thread(_mirror_card_to_gcs, card_data["cardId"], card_data)
+
+    await asyncio.gather(*(mirror(card_data) for card_data in cards))
+    logger.info(f"Mirrored {len(cards)} cards to GCS")
+
+
+def _chunks(items: list, size: int) -> List[list]:
+    """Split a list into consecutive chunks of at most size items."""
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+async def _run_batched(
+    func,
+    items: list,
+    batch_size: int = DATASTORE_BATCH_SIZE,
+    concurrency: int = DATASTORE_BATCH_CONCURRENCY
+) -> list:
+    """
+    Run a blocking batch call (e.g. ds_client.put_multi) over items in chunks.
+
+    Chunks are dispatched to worker threads concurrently, with at most
+    concurrency calls in flight.
+
+    Args:
+        func: Blocking callable taking a list of items
+        items: Items to process
+        batch_size: Maximum items per call
+        concurrency: Maximum concurrent calls
+
+    Returns:
+        list: Per-chunk results, in chunk order
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(batch: list):
+        async with semaphore:
+            return await asyncio.to_thread(func, batch)
+
+    return await asyncio.gather(*(run(batch) for batch in _chunks(items, batch_size)))
+
+
+def _new_ulids(count: int) -> List[str]:
+    """
+    Generate a batch of ULID strings.
+
+    All IDs in the batch share one millisecond timestamp, and their
+    randomness comes from a single os.urandom call.
+
+    Args:
+        count: Number of ULIDs to generate
+
+    Returns:
+        List[str]: ULID strings
+    """
+    timestamp = int(time.time() * 1000).to_bytes(6, "big")
+    randomness = os.urandom(10 * count)
+    return [
+        str(ulid.from_bytes(timestamp + randomness[i * 10:(i + 1) * 10]))
+        for i in range(count)
+    ]
+
+
 class Card(BaseModel):
     """Card model."""
     cardId: str
@@ -119,15 +371,19 @@ class UpdateCardRequest(BaseModel):
 
 
 @router.post("/api/cards", response_model=Card)
-async def create_card(request: CreateCardRequest = CreateCardRequest()):
+async def create_card(
+    background_tasks: BackgroundTasks,
+    request: CreateCardRequest = CreateCardRequest()
+):
     """
     Create a new card in Datastore and optionally mirror to GCS.
 
     Returns:
         Card: The created card metadata
     """
-    import time
     start_time = time.time()
+    # Per-step timings are only worth their clock reads when debug logging is on
+    debug_timing = logger.isEnabledFor(logging.DEBUG)
 
     if ds_client is None:
         raise HTTPException(status_code=500, detail="Datastore client not initialized")
@@ -135,21 +391,21 @@ async def create_card(request: CreateCardRequest = CreateCardRequest()):
     try:
         # Generate ULID
         card_id = str(ulid.new())
-        logger.debug(f"Generated ULID: {time.time() - start_time:.3f}s")
+        if debug_timing:
+            logger.debug("Generated ULID: %.3fs", time.time() - start_time)
 
         # Use provided values or generate random ones
-        import random
         if request.title and request.color:
             title = request.title
             color = request.color
         else:
             # Pick a random color and use its matching name with number
-            card_style = random.choice(PALETTE)
+            style_name, style_color = random.choice(PALETTE_PAIRS)
             number = random.randint(1, 99)
-            title = request.title or f"{card_style['name']} {number:02d}"
-            color = request.color or card_style["color"]
+            title = request.title or f"{style_name} {number:02d}"
+            color = request.color or style_color
         prompt = request.prompt or random.choice(LOREM_SENTENCES)
-        created_at = datetime.now(timezone.utc).isoformat()
+        created_at = datetime.now(UTC).isoformat()
 
         # Get media URLs and type from request
         media_url = request.media_url
@@ -157,7 +413,8 @@ async def create_card(request: CreateCardRequest = CreateCardRequest()):
         media_type = request.media_type  # "image", "video", or None
 
         # Save to Datastore
-        t1 = time.time()
+        if debug_timing:
+            t1 = time.time()
         key = ds_client.key("Card", card_id)
         entity = datastore.Entity(key=key)
         entity.update({
@@ -170,51 +427,49 @@ async def create_card(request: CreateCardRequest = CreateCardRequest()):
             "media_type": media_type,
             "createdAt": created_at,
         })
-        logger.debug(f"Created entity: {time.time() - t1:.3f}s")
-
-        t2 = time.time()
-        ds_client.put(entity)
-        logger.debug(f"Datastore put: {time.time() - t2:.3f}s")
-
-        # Optionally mirror to GCS as JSON
+        if debug_timing:
+            logger.debug("Created entity: %.3fs", time.time() - t1)
+
+        # The GCS mirror is already detached as a background task, so the
+        # only I/O left on the request path is the put - keep it off the loop
+        if debug_timing:
+            t2 = time.time()
+        await asyncio.to_thread(ds_client.put, entity)
+        if debug_timing:
+            logger.debug("Datastore put: %.3fs", time.time() - t2)
+
+        # Optionally mirror to GCS as JSON (after the response is sent)
         if gcs_client and bucket_name:
-            try:
-                bucket = gcs_client.bucket(bucket_name)
-                blob = bucket.blob(f"cards/{card_id}.json")
-                card_data = {
-                    "cardId": card_id,
-                    "title": title,
-                    "color": color,
-                    "prompt": prompt,
-                    "createdAt": created_at,
-                }
-                if media_url:
-                    card_data["media_url"] = media_url
-                if thumb_url:
-                    card_data["thumb_url"] = thumb_url
-                if media_type:
-                    card_data["media_type"] = media_type
-                card_json = json.dumps(card_data)
-                blob.upload_from_string(card_json, content_type="application/json")
-            except Exception as e:
-                logger.warning(f"Failed to mirror card to GCS: {e}")
-
-        logger.info(f"Created card {card_id}: {title} ({color}) - Total time: {time.time() - start_time:.3f}s")
-
-        return Card(
-            cardId=card_id,
-            title=title,
-            color=color,
-            prompt=prompt,
-            number=None,
-            media_url=media_url,
-            thumb_url=thumb_url,
-            media_type=media_type,
-            createdAt=created_at
-        )
+            card_data = {
+                "cardId": card_id,
+                "title": title,
+                "color": color,
+                "prompt": prompt,
+                "createdAt": created_at,
+            }
+            if media_url:
+                card_data["media_url"] = media_url
+            if thumb_url:
+                card_data["thumb_url"] = thumb_url
+            if media_type:
+                card_data["media_type"] = media_type
+            background_tasks.add_task(_mirror_card_to_gcs, card_id, card_data)
+
+        logger.info("Created card %s: %s (%s) - Total time: %.3fs", card_id, title, color, time.time() - start_time)
+
+        return ORJSONResponse({
+            "cardId": card_id,
+            "title": title,
+            "color": color,
+            "prompt": prompt,
+            "number": None,
+            "media_url": media_url,
+            "thumb_url": thumb_url,
+            "media_type": media_type,
+            "createdAt": created_at,
+        })
 
     except Exception as e:
-        import traceback
         logger.error(f"Error creating card: {e}")
         logger.error(f"Traceback: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -231,32 +486,133 @@ class UpdateShotRequest(BaseModel):
     title: str
 
 
-@router.patch("/api/cards/{card_id}", response_model=Card)
-async def update_card(card_id: str, request: UpdateCardRequest):
+class _BatchLoader:
     """
-    Update a card's metadata (title and/or color).
+    Coalesce concurrent card lookups into shared get_multi calls.
+
+    Bursts of small /api/cards/batch requests (per lane, per viewport)
+    would otherwise each pay a Datastore round-trip. load() queues the ID
+    and a background task collects everything queued within the window
+    (up to max_batch IDs) into one lookup, DataLoader-style. Batches are
+    dispatched without waiting for earlier ones, up to concurrency at once.
+    """
+
+    def __init__(
+        self,
+        window: float = CARD_LOADER_WINDOW,
+        max_batch: int = CARD_LOADER_MAX_BATCH,
+        concurrency: int = DATASTORE_BATCH_CONCURRENCY
+    ):
+        self.window = window
+        self.max_batch = max_batch
+        self._queue = asyncio.Queue()
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._worker = None
+        self._dispatches = set()
+
+    async def load(self, card_id: str) -> Optional[datastore.Entity]:
+        """
+        Look up one card, sharing the Datastore call with concurrent loads.
+
+        Args:
+            card_id: Card identifier
+
+        Returns:
+            Optional[datastore.Entity]: The card entity, or None if missing
+        """
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((card_id, future))
+        return await future
+
+    async def _run(self):
+        """Collect queued loads into batches and dispatch them."""
+        while True:
+            batch = [await self._queue.get()]
+            await asyncio.sleep(self.window)
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            await self._semaphore.acquire()
+            task = asyncio.create_task(self._dispatch(batch))
+            self._dispatches.add(task)
+            task.add_done_callback(self._dispatches.discard)
+
+    async def _dispatch(self, batch: list):
+        """Fetch one batch from Datastore and resolve its futures."""
+        try:
+            card_ids = list(dict.fromkeys(card_id for card_id, _ in batch))
+            keys = [_card_key(card_id) for card_id in card_ids]
+            entities = await asyncio.to_thread(ds_client.get_multi, keys)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self._semaphore.release()
+
+        entities_by_id = {entity.key.name: entity for entity in entities}
+        for card_id, future in batch:
+            if not future.done():
+                future.set_result(entities_by_id.get(card_id))
+
+
+_card_loader = _BatchLoader()
+
+
+def _card_dict(entity: datastore.Entity) -> dict:
+    """
+    Convert a Card entity to a response dict matching the Card model.
+
+    Handlers return these inside an ORJSONResponse, bypassing the Pydantic
+    response_model pass (which is kept on the routes for the OpenAPI schema).
 
     Args:
-        card_id: Card identifier
-        request: UpdateCardRequest with optional title and color
+        entity: Card entity from Datastore
 
     Returns:
-        Card: The updated card metadata
+        dict: Card fields, with defaults for missing values
     """
-    if ds_client is None:
-        raise HTTPException(status_code=500, detail="Datastore client not initialized")
+    return {
+        "cardId": entity.get("cardId"),
+        "title": entity.get("title", "Untitled"),
+        "color": entity.get("color", "#CCCCCC"),
+        "prompt": entity.get("prompt", ""),
+        "number": entity.get("number"),
+        "media_url": entity.get("media_url"),
+        "thumb_url": entity.get("thumb_url"),
+        "media_type": entity.get("media_type"),
+        "createdAt": entity.get("createdAt", ""),
+    }
+
+
+def _apply_card_update(card_id: str, request: UpdateCardRequest):
+    """
+    Apply an update request to a stored card (blocking).
 
-    try:
+    The read-modify-write runs inside a transaction so concurrent updates
+    don't clobber each other.
+
+    Args:
+        card_id: Card identifier
+        request: UpdateCardRequest with the fields to change
+
+    Returns:
+        Tuple of (updated entity, dict of changed fields for Yjs broadcast)
+
+    Raises:
+        HTTPException: 404 if the card does not exist
+    """
+    with ds_client.transaction():
         # Fetch existing card
-        key = ds_client.key("Card", card_id)
+        key = _card_key(card_id)
         entity = ds_client.get(key)
 
         if not entity:
             raise HTTPException(status_code=404, detail=f"Card {card_id} not found")
 
-        # Get sheet_id for Yjs broadcast
-        sheet_id = entity.get("sheetId")
-
         # Track which fields are being updated for Yjs broadcast
         updates = {}
 
@@ -272,64 +628,72 @@ async def update_card(card_id: str, request: UpdateCardRequest):
             updates["prompt"] = request.prompt
 
         # Handle media fields - these can be explicitly set to None to clear
-        if "media_url" in request.model_dump(exclude_unset=True):
+        set_fields = request.model_fields_set
+        if "media_url" in set_fields:
             entity["media_url"] = request.media_url
             updates["media_url"] = request.media_url
-        if "thumb_url" in request.model_dump(exclude_unset=True):
+        if "thumb_url" in set_fields:
             entity["thumb_url"] = request.thumb_url
             updates["thumb_url"] = request.thumb_url
-        if "media_type" in request.model_dump(exclude_unset=True):
+        if "media_type" in set_fields:
             entity["media_type"] = request.media_type
             updates["media_type"] = request.media_type
 
-        # Save to Datastore
+        # Save to Datastore (committed when the transaction exits)
         ds_client.put(entity)
 
+    return entity, updates
+
+
+@router.patch("/api/cards/{card_id}", response_model=Card)
+async def update_card(card_id: str, request: UpdateCardRequest, background_tasks: BackgroundTasks):
+    """
+    Update a card's metadata (title and/or color).
+
+    Args:
+        card_id: Card identifier
+        request: UpdateCardRequest with optional title and color
+
+    Returns:
+        Card: The updated card metadata
+    """
+    if ds_client is None:
+        raise HTTPException(status_code=500, detail="Datastore client not initialized")
+
+    try:
+        # Datastore client is blocking; run the transaction in a worker thread
+        entity, updates = await asyncio.to_thread(_apply_card_update, card_id, request)
+        _invalidate_cards(card_id)
+
+        # Get sheet_id for Yjs broadcast
+        sheet_id = entity.get("sheetId")
+
         # Broadcast updates to Yjs clients
-        if yjs_server and sheet_id and updates:
+        if yjs_sync and sheet_id and updates:
             try:
-                from yjs_sync import YjsSync
-                yjs_sync = YjsSync(yjs_server)
-                for field, value in updates.items():
-                    await yjs_sync.set_card_field(sheet_id, card_id, field, value)
-                logger.info(f"Broadcasted card updates to Yjs: {card_id} fields={list(updates.keys())}")
+                await yjs_sync.set_card_fields(sheet_id, card_id, updates)
+                logger.info("Broadcasted card updates to Yjs: %s fields=%s", card_id, list(updates))
             except Exception as e:
                 logger.warning(f"Failed to broadcast to Yjs (non-fatal): {e}")
 
-        # Optionally mirror to GCS
+        # Optionally mirror to GCS (after the response is sent)
         if gcs_client and bucket_name:
-            try:
-                bucket = gcs_client.bucket(bucket_name)
-                blob = bucket.blob(f"cards/{card_id}.json")
-                card_data = {
-                    "cardId": entity.get("cardId"),
-                    "title": entity.get("title"),
-                    "color": entity.get("color"),
-                    "prompt": entity.get("prompt", ""),
-                    "createdAt": entity.get("createdAt"),
-                }
-                if entity.get("media_url"):
-                    card_data["media_url"] = entity.get("media_url")
-                if entity.get("thumb_url"):
-                    card_data["thumb_url"] = entity.get("thumb_url")
-                card_json = json.dumps(card_data)
-                blob.upload_from_string(card_json, content_type="application/json")
-            except Exception as e:
-                logger.warning(f"Failed to mirror card to GCS: {e}")
-
-        logger.info(f"Updated card {card_id}: title={entity.get('title')}, color={entity.get('color')}")
-
-        return Card(
-            cardId=entity.get("cardId"),
-            title=entity.get("title"),
-            color=entity.get("color"),
-            prompt=entity.get("prompt", ""),
-            number=entity.get("number"),
-            media_url=entity.get("media_url"),
-            thumb_url=entity.get("thumb_url"),
-            media_type=entity.get("media_type"),
-            createdAt=entity.get("createdAt")
-        )
+            card_data = {
+                "cardId": entity.get("cardId"),
+                "title": entity.get("title"),
+                "color": entity.get("color"),
+                "prompt": entity.get("prompt", ""),
+                "createdAt": entity.get("createdAt"),
+            }
+            if entity.get("media_url"):
+                card_data["media_url"] = entity.get("media_url")
+            if entity.get("thumb_url"):
+                card_data["thumb_url"] = entity.get("thumb_url")
+            background_tasks.add_task(_mirror_card_to_gcs, card_id, card_data)
+
+        logger.info("Updated card %s: title=%s, color=%s", card_id, entity.get("title"), entity.get("color"))
+
+        return ORJSONResponse(_card_dict(entity))
 
     except HTTPException:
         raise
@@ -361,41 +725,184 @@ async def fetch_cards(request: FetchCardsRequest):
         if not card_ids:
             return []
 
-        # Batch fetch from Datastore
-        keys = [ds_client.key("Card", card_id) for card_id in card_ids]
-        entities = ds_client.get_multi(keys)
-
-        cards = []
-        for entity in entities:
-            if entity:
-                cards.append(Card(
-                    cardId=entity.get("cardId"),
-                    title=entity.get("title", "Untitled"),
-                    color=entity.get("color", "#CCCCCC"),
-                    prompt=entity.get("prompt", ""),
-                    number=entity.get("number"),
-                    media_url=entity.get("media_url"),
-                    thumb_url=entity.get("thumb_url"),
-                    media_type=entity.get("media_type"),
-                    createdAt=entity.get("createdAt", "")
-                ))
-
-        logger.info(f"Fetched {len(cards)} cards")
-        return cards
+        # Serve what we can from the cache, batch fetch the rest from Datastore
+        entities_by_id = {}
+        missing_ids = []
+        for card_id in card_ids:
+            entity = _card_cache.get(card_id)
+            if entity is None:
+                missing_ids.append(card_id)
+            else:
+                entities_by_id[card_id] = entity
+
+        if missing_ids:
+            # Concurrent requests share Datastore lookups through the loader
+            epoch = _card_cache_epoch
+            fetched = await asyncio.gather(*(_card_loader.load(card_id) for card_id in missing_ids))
+            # A write during the load may have made these stale; serve them
+            # once but don't cache them
+            cacheable = epoch == _card_cache_epoch
+            for entity in fetched:
+                if entity is not None:
+                    if cacheable:
+                        _card_cache[entity.key.name] = entity
+                    entities_by_id[entity.key.name] = entity
+
+        # Build plain dicts and encode them with orjson in one pass; returning
+        # a Response directly skips a Pydantic validate + serialize per card
+        # (response_model is kept for the OpenAPI schema)
+        cards = [
+            _card_dict(entity)
+            for entity in (entities_by_id.get(card_id) for card_id in card_ids)
+            if entity
+        ]
+
+        logger.debug("Fetched %d cards", len(cards))
+        return ORJSONResponse(cards)
 
     except Exception as e:
         logger.error(f"Error fetching cards: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _upload_size(file: UploadFile) -> int:
+    """
+    Return the size of an uploaded file without reading it into memory.
+
+    Args:
+        file: Uploaded file (already spooled by Starlette)
+
+    Returns:
+        int: Size in bytes
+    """
+    size = file.file.seek(0, os.SEEK_END)
+    file.file.seek(0)
+    return size
+
+
+async def _store_thumbnail(thumb_path: str, source: Union[bytes, str], is_image: bool) -> Optional[str]:
+    """
+    Generate a thumbnail in a worker process and upload it to GCS.
+
+    Args:
+        thumb_path: Destination blob path for the PNG thumbnail
+        source: Original image bytes, or a local file path for videos
+        is_image: True for images, False for videos
+
+    Returns:
+        Optional[str]: Public thumbnail URL, or None if generation/upload failed
+    """
+    media_type = "image" if is_image else "video"
+    make_thumbnail = media_utils.create_thumbnail if is_image else media_utils.create_video_thumbnail_from_file
+
+    try:
+        loop = asyncio.get_running_loop()
+        thumb_data = await loop.run_in_executor(_thumb_pool, make_thumbnail, source, 512)
+        thumb_url = await asyncio.to_thread(
+            media_utils.upload_to_gcs,
+            bucket,
+            thumb_path,
+            thumb_data,
+            'image/png'
+        )
+        logger.info(f"Created {media_type} thumbnail: {thumb_path}")
+        return thumb_url
+    except Exception as e:
+        logger.warning(f"Failed to create {media_type} thumbnail: {e}")
+        return None
+
+
+async def _store_media(
+    file_id: str,
+    source: Union[bytes, str],
+    extension: str,
+    content_type: str,
+    is_image: bool,
+    sheet_id: Optional[str] = None
+) -> Tuple[str, str, str]:
+    """
+    Upload original media and its thumbnail to GCS.
+
+    The original upload and thumbnail generation/upload run concurrently,
+    so GCS wall time is the slower of the two rather than their sum. If
+    the thumbnail fails, the original media URL is used in its place.
+
+    Args:
+        file_id: Unique file identifier (ULID)
+        source: Original media bytes, or a local file path (chunked upload)
+        extension: Original file extension
+        content_type: MIME type of the original media
+        is_image: True for images, False for videos
+        sheet_id: Owning sheet, used to scope the GCS paths
+
+    Returns:
+        Tuple[str, str, str]: (media_path, media_url, thumb_url)
+    """
+    media_path = media_utils.generate_media_path(file_id, extension, sheet_id=sheet_id)
+    thumb_path = media_utils.thumbnail_path_for(media_path)
+    upload = media_utils.upload_file_to_gcs if isinstance(source, str) else media_utils.upload_to_gcs
+
+    media_url, thumb_url = await asyncio.gather(
+        asyncio.to_thread(
+            upload,
+            bucket,
+            media_path,
+            source,
+            content_type
+        ),
+        _store_thumbnail(thumb_path, source, is_image)
+    )
+
+    return media_path, media_url, thumb_url or media_url
+
+
+async def _store_upload(
+    file: UploadFile,
+    file_id: str,
+    extension: str,
+    content_type: str,
+    is_image: bool,
+    sheet_id: Optional[str] = None
+) -> Tuple[str, str, str]:
+    """
+    Store an UploadFile's media and thumbnail in GCS.
+
+    Images are read into memory since Pillow needs the bytes anyway (max
+    10MB). Videos are never buffered: they are copied to a temp file in
+    fixed-size chunks, then the chunked GCS upload and ffmpeg both work
+    from that path.
+
+    Args:
+        file: Uploaded media file
+        file_id: Unique file identifier (ULID)
+        extension: Original file extension
+        content_type: MIME type of the original media
+        is_image: True for images, False for videos
+        sheet_id: Owning sheet, used to scope the GCS paths
+
+    Returns:
+        Tuple[str, str, str]: (media_path, media_url, thumb_url)
+    """
+    if is_image:
+        file_data = await file.read()
+        return await _store_media(file_id, file_data, extension, content_type, is_image, sheet_id)
+
+    video_path = await asyncio.to_thread(media_utils.spool_to_tempfile, file.file, f".{extension}")
+    try:
+        return await _store_media(file_id, video_path, extension, content_type, is_image, sheet_id)
+    finally:
+        os.unlink(video_path)
+
+
 @router.post("/api/media/upload")
-async def upload_media(file: UploadFile = File(...)):
+async def upload_media(file: UploadFile = File(...), sheet_id: Optional[str] = Form(None)):
     """
     Upload image or video file and create thumbnail.
-    Stores original and thumbnail in GCS with date-based paths.
+    Stores original and thumbnail in GCS with sheet-scoped, date-based paths.
 
     Args:
         file: Uploaded image or video file
+        sheet_id: Optional owning sheet (scopes the GCS path)
 
     Returns:
         dict: Contains media_url, thumb_url, media_type, and file metadata
@@ -418,15 +925,15 @@ async def upload_media(file: UploadFile = File(...)):
         # Determine media type
         media_type = "image" if is_image else "video"
 
-        # Read file data
-        file_data = await file.read()
+        # Check file size before reading any of it
+        size = _upload_size(file)
 
-        if not file_data:
+        if not size:
             raise HTTPException(status_code=400, detail="Empty file")
 
         # Check file size (max 10MB for images, 100MB for videos)
-        max_size = 10 * 1024 * 1024 if is_image else 100 * 1024 * 1024
-        if len(file_data) > max_size:
+        max_size = MAX_IMAGE_BYTES if is_image else MAX_VIDEO_BYTES
+        if size > max_size:
             max_mb = 10 if is_image else 100
             raise HTTPException(status_code=400, detail=f"File size must be less than {max_mb}MB")
 
@@ -439,50 +946,12 @@ async def upload_media(file: UploadFile = File(...)):
         # Determine content type
         content_type = media_utils.get_content_type(filename)
 
-        # Upload original media
-        media_path = media_utils.generate_media_path(file_id, extension, is_thumbnail=False)
-        media_url = media_utils.upload_to_gcs(
-            gcs_client,
-            bucket_name,
-            media_path,
-            file_data,
-            content_type
+        # Upload original media and thumbnail
+        media_path, media_url, thumb_url = await _store_upload(
+            file, file_id, extension, content_type, is_image, sheet_id
         )
 
-        # Create and upload thumbnail
-        thumb_url = None
-        if is_image:
-            try:
-                thumb_data = media_utils.create_thumbnail(file_data, max_size=512)
-                thumb_path = media_utils.generate_media_path(file_id, 'png', is_thumbnail=True)
-                thumb_url = media_utils.upload_to_gcs(
-                    gcs_client,
-                    bucket_name,
-                    thumb_path,
-                    thumb_data,
-                    'image/png'
-                )
-                logger.info(f"Created image thumbnail: {thumb_path}")
-            except Exception as e:
-                logger.warning(f"Failed to create image thumbnail: {e}")
-                thumb_url = media_url
-        elif is_video:
-            try:
-                thumb_data = media_utils.create_video_thumbnail(file_data, max_size=512)
-                thumb_path = media_utils.generate_media_path(file_id, 'png', is_thumbnail=True)
-                thumb_url = media_utils.upload_to_gcs(
-                    gcs_client,
-                    bucket_name,
-                    thumb_path,
-                    thumb_data,
-                    'image/png'
-                )
-                logger.info(f"Created video thumbnail: {thumb_path}")
-            except Exception as e:
-                logger.warning(f"Failed to create video thumbnail: {e}")
-                thumb_url = media_url
-
-        logger.info(f"Uploaded {media_type}: {media_path} (size: {len(file_data)} bytes)")
+        logger.info(f"Uploaded {media_type}: {media_path} (size: {size} bytes)")
 
         return {
             "media_url": media_url,
@@ -491,17 +960,179 @@ async def upload_media(file: UploadFile = File(...)):
             "file_id": file_id,
             "filename": filename,
             "content_type": content_type,
-            "size": len(file_data)
+            "size": size
         }
 
     except HTTPException:
         raise
     except Exception as e:
-        import traceback
         logger.error(f"Error uploading media: {e}\n{traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+class PresignMediaRequest(BaseModel):
+    """Request a signed URL for uploading media directly to GCS."""
+    filename: str
+    sheet_id: Optional[str] = None
+
+
+class FinalizeMediaRequest(BaseModel):
+    """Finalize media that was uploaded directly to GCS."""
+    media_path: str
+    filename: Optional[str] = None
+
+
+@router.post("/api/media/presign")
+async def presign_media(request: PresignMediaRequest):
+    """
+    Create a signed URL the client can PUT media bytes to directly.
+
+    The bytes go straight to GCS instead of streaming through this server.
+    The client must send the returned upload_headers with its PUT, then
+    call /api/media/finalize with the returned media_path.
+
+    Args:
+        request: PresignMediaRequest with the original filename
+
+    Returns:
+        dict: upload_url, upload_headers, media_path, file_id, media_type
+    """
+    if gcs_client is None or bucket_name is None:
+        raise HTTPException(status_code=500, detail="GCS client not initialized")
+
+    filename = request.filename or "upload"
+    is_image = media_utils.is_image(filename)
+    is_video = media_utils.is_video(filename)
+
+    if not is_image and not is_video:
+        raise HTTPException(
+            status_code=400,
+            detail="Only image files (PNG, JPEG, WebP, GIF) and video files (MP4, MOV, WebM) are allowed"
+        )
+
+    try:
+        extension = filename.split('.')[-1].lower() if '.' in filename else ('png' if is_image else 'mp4')
+        file_id = str(ulid.new())
+        content_type = media_utils.get_content_type(filename)
+        media_path = media_utils.generate_media_path(file_id, extension, sheet_id=request.sheet_id)
+        max_size = MAX_IMAGE_BYTES if is_image else MAX_VIDEO_BYTES
+
+        # GCS enforces the size limit via the signed content-length-range header
+        upload_headers = {
+            "Content-Type": content_type,
+            "x-goog-content-length-range": f"0,{max_size}",
+        }
+        upload_url = await asyncio.to_thread(
+            bucket.blob(media_path).generate_signed_url,
+            version="v4",
+            method="PUT",
+            expiration=SIGNED_UPLOAD_TTL,
+            content_type=content_type,
+            headers={"x-goog-content-length-range": f"0,{max_size}"},
+        )
+
+        logger.info(f"Signed direct upload for {media_path}")
+
+        return {
+            "upload_url": upload_url,
+            "upload_headers": upload_headers,
+            "media_path": media_path,
+            "file_id": file_id,
+            "media_type": "image" if is_image else "video",
+            "content_type": content_type,
+        }
+
+    except Exception as e:
+        logger.error(f"Error signing media upload: {e}\n{traceback.format_exc()}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _publish_uploaded_media(media_path: str, is_image: bool):
+    """
+    Make a directly-uploaded blob public and fetch its contents (blocking).
+
+    Images are returned as bytes. Videos are downloaded in chunks to a temp
+    file whose path is returned instead; the caller must unlink it.
+
+    Args:
+        media_path: Blob path returned by /api/media/presign
+        is_image: True for images, False for videos
+
+    Returns:
+        Tuple of (blob, bytes or temp file path), or (None, None) if the blob is missing
+    """
+    blob = bucket.get_blob(media_path)
+    if blob is None:
+        return None, None
+    media_utils.make_blob_public(blob)
+    if is_image:
+        return blob, blob.download_as_bytes()
+
+    blob.chunk_size = media_utils.UPLOAD_CHUNK_SIZE
+    with tempfile.NamedTemporaryFile(suffix=os.path.splitext(media_path)[1], delete=False) as temp_file:
+        video_path = temp_file.name
+    try:
+        blob.download_to_filename(video_path)
+    except Exception:
+        os.unlink(video_path)
+        raise
+    return blob, video_path
+
+
+@router.post("/api/media/finalize")
+async def finalize_media(request: FinalizeMediaRequest):
+    """
+    Finalize a direct upload: publish the blob and create its thumbnail.
+
+    Args:
+        request: FinalizeMediaRequest with the media_path from presign
+
+    Returns:
+        dict: Same shape as /api/media/upload
+    """
+    if gcs_client is None or bucket_name is None:
+        raise HTTPException(status_code=500, detail="GCS client not initialized")
+
+    media_path = request.media_path
+    if not media_utils.is_media_path(media_path):
+        raise HTTPException(status_code=400, detail="Invalid media path")
+
+    try:
+        is_image = media_utils.is_image(media_path)
+        blob, source = await asyncio.to_thread(_publish_uploaded_media, media_path, is_image)
+        if blob is None:
+            raise HTTPException(status_code=404, detail="Uploaded media not found")
+
+        media_type = "image" if is_image else "video"
+        file_id = media_path.rsplit('/', 1)[-1].split('.')[0]
+        media_url = blob.public_url
+
+        try:
+            thumb_path = media_utils.thumbnail_path_for(media_path)
+            thumb_url = await _store_thumbnail(thumb_path, source, is_image) or media_url
+        finally:
+            if not is_image:
+                os.unlink(source)
+
+        logger.info(f"Finalized direct upload {media_type}: {media_path} (size: {blob.size} bytes)")
+
+        return {
+            "media_url": media_url,
+            "thumb_url": thumb_url,
+            "media_type": media_type,
+            "file_id": file_id,
+            "filename": request.filename or media_path.rsplit('/', 1)[-1],
+            "content_type": blob.content_type,
+            "size": blob.size
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error finalizing media upload: {e}\n{traceback.format_exc()}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.post("/api/media/upload-card")
 async def upload_card(
     file: UploadFile = File(...),
@@ -530,140 +1161,110 @@ async def upload_card(
     Returns:
         Card: The created card metadata
     """
-    if ds_client is None or gcs_client is None or bucket_name is None:
+    if ds_client is None or gcs_client is None or bucket_name is None or yjs_sync is None:
         raise HTTPException(status_code=500, detail="Required clients not initialized")
 
     try:
+        # Validate before touching Yjs so rejected uploads never show a placeholder
         filename = file.filename or "upload"
         card_title = title or filename
-
-        # Step 1: Create loading placeholder in Yjs immediately (so UI shows spinner right away)
-        from yjs_sync import YjsSync
-        yjs_sync = YjsSync(yjs_server)
-
-        placeholder_data = {
-            'title': card_title,
-            'color': '#CCCCCC',
-            'prompt': '',
-            'isLoading': True
-        }
-
-        await yjs_sync.sync_card_to_sheet(
-            sheet_id=sheet_id,
-            card_id=card_id,
-            card_data=placeholder_data
-        )
-
-        # Insert card at the front of the lane with proper position offset
-        # insert_index=0 -> position 1, insert_index=1 -> position 2, etc.
-        await yjs_sync.insert_card_at_front_of_lane(
-            sheet_id=sheet_id,
-            lane_id=lane_id,
-            card_id=card_id,
-            position_offset=insert_index
-        )
-
-        logger.info(f"Created loading placeholder for card {card_id} at position {1 + insert_index} in lane {lane_id}")
-
-        # Step 2: Upload media (this is the slow part)
-        filename = file.filename or "upload"
         is_image = media_utils.is_image(filename)
-        is_video = media_utils.is_video(filename)
 
-        if not is_image and not is_video:
+        if not is_image and not media_utils.is_video(filename):
             raise HTTPException(
                 status_code=400,
                 detail="Only image and video files are allowed"
             )
 
-        media_type = "image" if is_image else "video"
-        file_data = await file.read()
+        size = _upload_size(file)
 
-        if not file_data:
+        if not size:
             raise HTTPException(status_code=400, detail="Empty file")
 
         # Check file size
-        max_size = 10 * 1024 * 1024 if is_image else 100 * 1024 * 1024
-        if len(file_data) > max_size:
+        max_size = MAX_IMAGE_BYTES if is_image else MAX_VIDEO_BYTES
+        if size > max_size:
             max_mb = 10 if is_image else 100
             raise HTTPException(status_code=400, detail=f"File size must be less than {max_mb}MB")
 
+        media_type = "image" if is_image else "video"
         extension = filename.split('.')[-1].lower() if '.' in filename else ('png' if is_image else 'mp4')
-        file_id = str(ulid.new())
         content_type = media_utils.get_content_type(filename)
+        file_id = str(ulid.new())
 
-        # Upload original media
-        media_path = media_utils.generate_media_path(file_id, extension, is_thumbnail=False)
-        media_url = media_utils.upload_to_gcs(
-            gcs_client,
-            bucket_name,
-            media_path,
-            file_data,
-            content_type
-        )
+        # Step 1: Create loading placeholder in Yjs immediately (so UI shows spinner right away)
+        placeholder_data = {
+            'title': card_title,
+            'color': '#CCCCCC',
+            'prompt': '',
+            'isLoading': True
+        }
 
-        # Create and upload thumbnail
-        thumb_url = None
-        if is_image:
-            try:
-                thumb_data = media_utils.create_thumbnail(file_data, max_size=512)
-                thumb_path = media_utils.generate_media_path(file_id, 'png', is_thumbnail=True)
-                thumb_url = media_utils.upload_to_gcs(
-                    gcs_client,
-                    bucket_name,
-                    thumb_path,
-                    thumb_data,
-                    'image/png'
-                )
-            except Exception as e:
-                logger.warning(f"Failed to create image thumbnail: {e}")
-                thumb_url = media_url
-        elif is_video:
-            try:
-                thumb_data = media_utils.create_video_thumbnail(file_data, max_size=512)
-                thumb_path = media_utils.generate_media_path(file_id, 'png', is_thumbnail=True)
-                thumb_url = media_utils.upload_to_gcs(
-                    gcs_client,
-                    bucket_name,
-                    thumb_path,
-                    thumb_data,
-                    'image/png'
-                )
-            except Exception as e:
-                logger.warning(f"Failed to create video thumbnail: {e}")
-                thumb_url = media_url
+        # Create the card and insert it at the front of the lane in one transaction.
+        # The placeholder doesn't depend on the file, so it runs while the upload
+        # proceeds; it is awaited before the final Yjs update in step 4.
+        # insert_index=0 -> position 1, insert_index=1 -> position 2, etc.
+        placeholder_task = asyncio.create_task(yjs_sync.create_and_place_card(
+            sheet_id=sheet_id,
+            card_id=card_id,
+            lane_id=lane_id,
+            position_offset=insert_index,
+            card_data=placeholder_data
+        ))
 
-        logger.info(f"Uploaded {media_type}: {media_path} (size: {len(file_data)} bytes)")
+        try:
+            # Step 2: Upload media (this is the slow part)
+            # Upload original media and thumbnail
+            media_path, media_url, thumb_url = await _store_upload(
+                file, file_id, extension, content_type, is_image, sheet_id
+            )
 
-        # Step 3: Create card entity in Datastore (source of truth)
-        card_data = {
-            "title": card_title,
-            "color": "#CCCCCC",
-            "prompt": "",
-            "media_url": media_url,
-            "thumb_url": thumb_url,
-            "media_type": media_type
-        }
+            logger.info(f"Uploaded {media_type}: {media_path} (size: {size} bytes)")
 
-        entity = datastore.Entity(key=ds_client.key("Card", card_id))
-        entity.update({
-            "cardId": card_id,
-            **card_data
-        })
-        ds_client.put(entity)
-        logger.info(f"Created card in Datastore: {card_id}")
+            # Step 3: Create card entity in Datastore (source of truth) before
+            # collaborators see the finished card
+            card_data = {
+                "title": card_title,
+                "color": "#CCCCCC",
+                "prompt": "",
+                "media_url": media_url,
+                "thumb_url": thumb_url,
+                "media_type": media_type
+            }
 
-        # Step 4: Update Yjs with final card data (removes isLoading, adds media)
-        final_card_data = {
-            **card_data,
-            "isLoading": False  # Clear loading state
-        }
+            entity = datastore.Entity(key=ds_client.key("Card", card_id))
+            entity.update({
+                "cardId": card_id,
+                **card_data
+            })
 
-        sync_success = await yjs_sync.sync_card_to_sheet(
-            sheet_id=sheet_id,
-            card_id=card_id,
-            card_data=final_card_data
-        )
+            await asyncio.to_thread(ds_client.put, entity)
+            _invalidate_cards(card_id)
+            logger.info(f"Created card in Datastore: {card_id}")
+        except Exception:
+            # Let the placeholder finish so its outcome is retrieved, not orphaned
+            await asyncio.gather(placeholder_task, return_exceptions=True)
+            raise
+
+        # The final fields must land after the placeholder or it would overwrite them
+        placed = await placeholder_task
+
+        if placed:
+            logger.info(f"Created loading placeholder for card {card_id} at position {1 + insert_index} in lane {lane_id}")
+
+            # Step 4: Update Yjs with final card data (removes isLoading, adds media);
+            # title/color/prompt were already written with the placeholder
+            final_fields = {
+                "media_url": media_url,
+                "thumb_url": thumb_url,
+                "media_type": media_type,
+                "isLoading": False  # Clear loading state
+            }
+            sync_success = await yjs_sync.set_card_fields(sheet_id, card_id, final_fields)
+        else:
+            # The placeholder may be missing, so send the whole card, not just the media fields
+            logger.warning(f"Failed to place loading placeholder for card {card_id} in lane {lane_id}; syncing full card")
+            sync_success = await yjs_sync.sync_card_to_sheet(sheet_id, card_id, {**card_data, "isLoading": False})
 
         if not sync_success:
             logger.warning(f"Card {card_id} saved to Datastore but failed to update in Yjs")
@@ -683,7 +1284,6 @@ async def upload_card(
     except HTTPException:
         raise
     except Exception as e:
-        import traceback
         logger.error(f"Error uploading media: {e}")
         logger.error(f"Traceback: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -704,14 +1304,21 @@ async def get_shots(sheet_id: str):
         raise HTTPException(status_code=500, detail="Datastore client not initialized")
 
     try:
-        # Query all shots for this sheet
+        shot_titles = _shots_cache.get(sheet_id)
+        if shot_titles is not None:
+            return shot_titles
+
+        # Query all shots for this sheet. Full entities, not a projection: a
+        # projection would need a composite index and would skip shots with
+        # no (or an unindexed) title
         query = ds_client.query(kind="Shot")
         query.add_filter("sheetId", "=", sheet_id)
-        shots = list(query.fetch())
-
-        shot_titles = {}
-        for shot in shots:
-            shot_titles[shot.get("shotId")] = shot.get("title", "")
+        # Build the map while iterating the result pages instead of
+        # materializing the entities in a list first
+        shot_titles = await asyncio.to_thread(
+            lambda: {shot.get("shotId"): shot.get("title", "") for shot in query.fetch()}
+        )
+        _shots_cache[sheet_id] = shot_titles
 
         logger.info(f"Fetched {len(shot_titles)} shot titles for sheet {sheet_id}")
         return shot_titles
@@ -757,7 +1364,11 @@ class RegenerateSheetRequest(BaseModel):
 
 
 @router.post("/api/sheets/{sheet_id}/regenerate")
-async def regenerate_sheet(sheet_id: str, request: RegenerateSheetRequest = RegenerateSheetRequest()):
+async def regenerate_sheet(
+    sheet_id: str,
+    background_tasks: BackgroundTasks,
+    request: RegenerateSheetRequest = RegenerateSheetRequest()
+):
     """
     Regenerate a sheet by clearing it and creating new cards.
 
@@ -775,8 +1386,6 @@ async def regenerate_sheet(sheet_id: str, request: RegenerateSheetRequest = Rege
         raise HTTPException(status_code=500, detail="Datastore client not initialized")
 
     try:
-        import random
-
         # Generate or use provided cards_per_col
         num_cols = request.num_cols
         if request.cards_per_col is None:
@@ -790,97 +1399,88 @@ async def regenerate_sheet(sheet_id: str, request: RegenerateSheetRequest = Rege
         logger.info(f"Regenerating sheet {sheet_id} with {num_cols} cols, cards_per_col={cards_per_col}, total={total_cards}")
 
         # Get the room (this will create it if it doesn't exist)
-        room_name = f"/yjs/{sheet_id}"
-        room = await yjs_server.get_room(room_name)
-
-        # Wait for room to be ready
-        if not room.ready:
-            await room.start()
+        room = await yjs_server.get_room_by_id(sheet_id)
 
         # Clear the Yjs document and populate with new data
         logger.info(f"Clearing Yjs document for {sheet_id}")
 
         # Get Y structures (simple 2D grid)
-        row_order = room.ydoc.get_array('rowOrder')
-        col_order = room.ydoc.get_array('colOrder')
-        cells = room.ydoc.get_map('cells')
-        cards_metadata = room.ydoc.get_map('cardsMetadata')
+        row_order = room.row_order
+        col_order = room.col_order
+        cells = room.cells
+        cards_metadata = room.cards_metadata
 
         # Use a transaction to modify the document
-        logger.info(f"Before clear: rows={len(row_order)}, cols={len(col_order)}, cells={len(list(cells.keys()))}, cardsMetadata={len(list(cards_metadata.keys()))}")
+        logger.info(f"Before clear: rows={len(row_order)}, cols={len(col_order)}, cells={len(cells)}, cardsMetadata={len(cards_metadata)}")
 
         # Delete old cards from Datastore
         old_card_ids = list(cards_metadata.keys())
         if old_card_ids:
             logger.info(f"Deleting {len(old_card_ids)} old cards from Datastore")
             old_keys = [ds_client.key("Card", card_id) for card_id in old_card_ids]
-            ds_client.delete_multi(old_keys)
+            await _run_batched(ds_client.delete_multi, old_keys, DATASTORE_MAX_MUTATIONS)
+            _invalidate_cards(*old_card_ids)
             logger.info(f"Deleted {len(old_card_ids)} old cards from Datastore")
 
-        # Wipe all media from GCS (for prototype - removes everything in media/)
+            # Their GCS mirrors go too, or every regenerate leaks a blob per card
+            if gcs_client and bucket_name:
+                try:
+                    mirror_blobs = [bucket.blob(f"cards/{card_id}.json") for card_id in old_card_ids]
+                    await _run_batched(_delete_blob_batch, mirror_blobs, GCS_BATCH_SIZE, GCS_MIRROR_CONCURRENCY)
+                    logger.info(f"Deleted GCS mirrors of {len(old_card_ids)} old cards")
+                except Exception as e:
+                    logger.warning(f"Failed to delete old card mirrors from GCS (non-fatal): {e}")
+
+        # Wipe this sheet's media from GCS
         if gcs_client and bucket_name:
             try:
-                bucket = gcs_client.bucket(bucket_name)
-                logger.info(f"Wiping all media from GCS bucket {bucket_name}/media/")
-
-                # List all blobs in the media/ prefix
-                blobs = list(bucket.list_blobs(prefix="media/"))
-                logger.info(f"Found {len(blobs)} media files to delete")
-
-                # Delete all media blobs in batches
-                if blobs:
-                    # GCS delete_blobs can handle batches efficiently
-                    blob_names = [blob.name for blob in blobs]
-                    for blob_name in blob_names:
-                        bucket.delete_blob(blob_name)
-
-                    logger.info(f"Deleted {len(blobs)} media files from GCS")
+                prefix = media_utils.media_prefix(sheet_id)
+                logger.info(f"Wiping media from GCS bucket {bucket_name}/{prefix}")
+
+                # Walk the listing a page at a time so memory stays O(page), deleting
+                # each page 100 blobs per batched request, several batches in flight
+                pages = bucket.list_blobs(prefix=prefix, page_size=GCS_LIST_PAGE_SIZE).pages
+                deleted = 0
+                while True:
+                    page = await asyncio.to_thread(lambda: list(next(pages, ())))
+                    if not page:
+                        break
+                    await _run_batched(_delete_blob_batch, page, GCS_BATCH_SIZE, GCS_MIRROR_CONCURRENCY)
+                    deleted += len(page)
+
+                logger.info(f"Deleted {deleted} media files from GCS")
 
                 # Also delete the snapshot to force fresh regeneration
+                # Delete unconditionally; a missing snapshot is a 404, not an extra exists() call
                 snapshot_blob = bucket.blob(f"sheets/{sheet_id}/snapshot.ybin")
-                if snapshot_blob.exists():
-                    snapshot_blob.delete()
+                try:
+                    await asyncio.to_thread(snapshot_blob.delete)
                     logger.info(f"Deleted snapshot for sheet {sheet_id}")
+                except NotFound:
+                    pass
+                # Deltas on any generation of the deleted snapshot are dead weight
+                deleted_deltas = await asyncio.to_thread(gcs_snapshots.delete_sheet_deltas, bucket_name, sheet_id)
+                logger.info(f"Deleted {deleted_deltas} snapshot deltas for sheet {sheet_id}")
+                # Later saves must write a full snapshot, not deltas on the deleted one
+                gcs_snapshots.reset_snapshot_state(sheet_id)
             except Exception as e:
                 logger.warning(f"Failed to wipe GCS media (non-fatal): {e}")
 
-        with room.ydoc.begin_transaction() as txn:
-            # Clear existing data
-            if len(row_order) > 0:
-                row_order.delete_range(txn, 0, len(row_order))
-            if len(col_order) > 0:
-                col_order.delete_range(txn, 0, len(col_order))
-
-            # Clear all cells
-            for key in list(cells.keys()):
-                cells.pop(txn, key)
-
-            # Clear all card metadata
-            for card_id in list(cards_metadata.keys()):
-                cards_metadata.pop(txn, card_id)
-
-            logger.info(f"After clear: rows={len(row_order)}, cols={len(col_order)}, cells={len(list(cells.keys()))}, cardsMetadata={len(list(cards_metadata.keys()))}")
-
-            # Add columns
-            for i in range(num_cols):
-                col_id = f"c-{i}"
-                col_order.append(txn, col_id)
-
-            logger.info(f"After adding columns: cols={len(col_order)}")
-
         # Create all cards
         logger.info(f"Creating {total_cards} cards")
         all_cards = []
         all_entities = []
 
-        for i in range(total_cards):
-            card_id = str(ulid.new())
-            card_style = random.choice(PALETTE)
-            number = random.randint(1, 99)
-            title = f"{card_style['name']} {number:02d}"
-            color = card_style["color"]
-            prompt = random.choice(LOREM_SENTENCES)
-            created_at = datetime.now(timezone.utc).isoformat()
+        # Sample all random fields in bulk; every card shares the regeneration timestamp
+        styles = random.choices(PALETTE_PAIRS, k=total_cards)
+        prompts = random.choices(LOREM_SENTENCES, k=total_cards)
+        numbers = random.choices(range(1, 100), k=total_cards)
+        created_at = datetime.now(UTC).isoformat()
+
+        card_ids = _new_ulids(total_cards)
+
+        for card_id, (style_name, color), number, prompt in zip(card_ids, styles, numbers, prompts):
+            title = f"{style_name} {number:02d}"
 
             # Prepare entity for batch write
             key = ds_client.key("Card", card_id)
@@ -903,32 +1503,53 @@ async def regenerate_sheet(sheet_id: str, request: RegenerateSheetRequest = Rege
 
         # Batch write all cards to Datastore at once
         logger.info(f"Batch writing {len(all_entities)} cards to Datastore")
-        ds_client.put_multi(all_entities)
+        await _run_batched(ds_client.put_multi, all_entities)
         logger.info(f"Batch write complete")
 
-        # Add rows and assign cards within a transaction
+        # Mirror the new cards to GCS in parallel (after the response is sent)
+        if gcs_client and bucket_name:
+            background_tasks.add_task(_mirror_cards_to_gcs, [dict(entity) for entity in all_entities])
+
+        # Lay out the new grid up front so the transaction only applies it
+        col_ids = [f"c-{i}" for i in range(num_cols)]
+        row_ids = [f"r-{row_ulid}" for row_ulid in _new_ulids(max_rows)]
+        # Cards fill each column top-down in order; zip stops when cards run out
+        cell_keys = (
+            f"{row_id}:{col_id}"
+            for col_id, num_cards_in_col in zip(col_ids, cards_per_col)
+            for row_id in row_ids[:num_cards_in_col]
+        )
+        cell_values = [(cell_key, {"cardId": card["cardId"]}) for cell_key, card in zip(cell_keys, all_cards)]
+
+        # Clear and repopulate the document in a single transaction so
+        # clients receive one update instead of a cleared sheet followed by
+        # a second update with the new grid
         with room.ydoc.begin_transaction() as txn:
-            # Create max_rows rows
-            for i in range(max_rows):
-                row_id = f"r-{ulid.new()}"
-                row_order.append(txn, row_id)
+            # Clear existing data
+            if len(row_order) > 0:
+                row_order.delete_range(txn, 0, len(row_order))
+            if len(col_order) > 0:
+                col_order.delete_range(txn, 0, len(col_order))
+
+            # Clear all cells
+            for key in list(cells.keys()):
+                cells.pop(txn, key)
+
+            # Clear all card metadata
+            for card_id in list(cards_metadata.keys()):
+                cards_metadata.pop(txn, card_id)
+
+            logger.info(f"After clear: rows={len(row_order)}, cols={len(col_order)}, cells={len(cells)}, cardsMetadata={len(cards_metadata)}")
+
+            # Add columns and max_rows rows, one bulk insert per array
+            col_order.insert_range(txn, 0, col_ids)
+            row_order.insert_range(txn, 0, row_ids)
 
             # Assign cards to columns (variable length per column)
-            card_index = 0
-            for col_idx in range(num_cols):
-                col_id = f"c-{col_idx}"
-                num_cards_in_col = cards_per_col[col_idx]
-
-                # Assign cards to this column
-                for row_idx in range(num_cards_in_col):
-                    if card_index < len(all_cards):
-                        row_id = list(row_order)[row_idx]
-                        card = all_cards[card_index]
-                        cell_key = f"{row_id}:{col_id}"
-                        cells.set(txn, cell_key, {"cardId": card["cardId"]})
-                        card_index += 1
-
-        logger.info(f"Sheet {sheet_id} regenerated successfully: rows={len(row_order)}, cols={len(col_order)}, cells={len(list(cells.keys()))}")
+            for cell_key, cell in cell_values:
+                cells.set(txn, cell_key, cell)
+
+        logger.info(f"Sheet {sheet_id} regenerated successfully: rows={len(row_order)}, cols={len(col_order)}, cells={len(cells)}")
 
         return {
             "status": "success",
@@ -940,37 +1561,188 @@ async def regenerate_sheet(sheet_id: str, request: RegenerateSheetRequest = Rege
         }
 
     except Exception as e:
-        import traceback
         logger.error(f"Error regenerating sheet: {e}")
         logger.error(f"Traceback: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-def _generate_color_png(color: str) -> io.BytesIO:
+def _png_chunk(chunk_type: bytes, data: bytes) -> bytes:
+    """Frame one PNG chunk: length, type, data, CRC32 of type + data."""
+    return (
+        struct.pack(">I", len(data)) + chunk_type + data
+        + struct.pack(">I", zlib.crc32(chunk_type + data))
+    )
+
+
+@functools.lru_cache(maxsize=256)
+def _generate_color_png(color: str) -> bytes:
     """
-    Generate a 16:9 PNG image with a solid color.
+    Generate a small 16:9 PNG image with a solid color.
+
+    A solid color carries no detail, so a 16x9 image scales up losslessly
+    and encodes in microseconds instead of a full 1920x1080 frame. Results
+    are cached per color since a column repeats a handful of palette colors.
 
     Args:
-        color: Hex color string (e.g., "#FF6B6B")
+        color: Hex color string (e.g., "#FF6B6B"); anything that isn't six
+            hex digits renders as FALLBACK_COLOR
 
     Returns:
-        BytesIO buffer containing the PNG image
+        bytes: The PNG image
     """
-    # Create 16:9 image (1920x1080)
-    width, height = 1920, 1080
+    if not isinstance(color, str) or not HEX_COLOR_PATTERN.fullmatch(color):
+        color = FALLBACK_COLOR
+
+    # Create 16:9 image
+    width, height = 16, 9
 
     # Convert hex color to RGB
-    color_rgb = tuple(int(color.lstrip('#')[i:i+2], 16) for i in (0, 2, 4))
+    color_rgb = bytes(int(color.lstrip('#')[i:i+2], 16) for i in (0, 2, 4))
+
+    # Every scanline is filter byte 0 followed by the same pixels, so build
+    # the PNG directly instead of going through Pillow's encoder
+    scanline = b"\x00" + color_rgb * width
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)  # 8-bit RGB
+    return b"".join((
+        PNG_SIGNATURE,
+        _png_chunk(b"IHDR", header),
+        _png_chunk(b"IDAT", zlib.compress(scanline * height, 1)),
+        _png_chunk(b"IEND", b""),
+    ))
 
-    # Create image with solid color
-    img = Image.new('RGB', (width, height), color_rgb)
 
-    # Save image to buffer
-    img_buffer = io.BytesIO()
-    img.save(img_buffer, format='PNG')
-    img_buffer.seek(0)
+def _media_extension(content_type: str, media_url: str) -> str:
+    """
+    Pick a file extension for downloaded media.
+
+    Uses the response's content type, falling back to the URL's own
+    extension for generic types, then to .png.
+
+    Args:
+        content_type: Content-Type header of the media response
+        media_url: URL the media was downloaded from
+
+    Returns:
+        str: Extension including the leading dot (e.g. ".jpg")
+    """
+    mime_type = content_type.split(';', 1)[0].strip().lower()
+    ext = mimetypes.guess_extension(mime_type) if mime_type != "application/octet-stream" else None
+    if not ext:
+        ext = os.path.splitext(httpx.URL(media_url).path)[1].lower()
+    return ext or ".png"
+
+
+async def _fetch_card_content(
+    client: httpx.AsyncClient,
+    semaphore: asyncio.Semaphore,
+    idx: int,
+    card: dict
+) -> Tuple[bytes, str]:
+    """
+    Get the content bytes for one card in a column download.
+
+    Downloads the card's media if it has any, otherwise (or if the download
+    fails) falls back to a solid color PNG. Media bytes are returned as-is,
+    never transcoded.
+
+    Args:
+        client: Shared HTTP client
+        semaphore: Bounds concurrent downloads
+        idx: 1-based position of the card in the column (for logging)
+        card: Card dict from the request body
+
+    Returns:
+        Tuple[bytes, str]: Content bytes and file extension (e.g. ".jpg")
+    """
+    media_url = card.get("media_url")
 
-    return img_buffer
+    if media_url:
+        # Download the actual media file
+        try:
+            async with semaphore:
+                logger.info(f"Downloading media for card {idx}: {media_url}")
+                response = await client.get(media_url)
+                response.raise_for_status()
+
+            ext = _media_extension(response.headers.get("content-type", "image/png"), media_url)
+            logger.info(f"Downloaded media for card {idx} ({len(response.content)} bytes, {ext})")
+            return response.content, ext
+        except Exception as e:
+            logger.warning(f"Failed to download media for card {idx}: {e}, falling back to color PNG")
+
+    # Generate color PNG for cards without media
+    return _generate_color_png(card.get("color", "#CCCCCC")), ".png"
+
+
+class _ZipSink:
+    """
+    Write-only file object that collects zip output for streaming.
+
+    It has no tell()/seek(), so ZipFile writes in streaming mode (sizes in
+    data descriptors after each entry) and never rewinds.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        """Return and clear everything written since the last drain."""
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+async def _stream_column_zip(column_cards: List[dict], cards_json: List[dict]):
+    """
+    Yield a column's zip archive as it is built.
+
+    All media downloads start up front; entries are written in order as
+    each one completes, so bytes reach the client while later media is
+    still downloading and the whole archive is never held in memory.
+    cards.json goes last, once each entry's real extension is known.
+
+    Args:
+        column_cards: Card dicts from the request body, in column order
+        cards_json: cards.json entries, parallel to column_cards; each
+            gets its "source" filled in here
+
+    Yields:
+        bytes: Successive chunks of the zip file
+    """
+    sink = _ZipSink()
+    # The shared client's pool is sized for all requests; cap this one's share
+    semaphore = asyncio.Semaphore(DOWNLOAD_CONCURRENCY)
+    client = _get_http_client()
+
+    tasks = [
+        asyncio.create_task(_fetch_card_content(client, semaphore, idx, card))
+        for idx, card in enumerate(column_cards, start=1)
+    ]
+    try:
+        # Level 1 for cards.json; media is already compressed, so store it as-is
+        with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED, compresslevel=1) as zip_file:
+            # ZipFile isn't safe for concurrent writers; write in column order
+            for idx, (task, entry) in enumerate(zip(tasks, cards_json), start=1):
+                content, ext = await task
+                entry["source"] = f"content/{idx}{ext}"
+                zip_file.writestr(entry["source"], content, compress_type=zipfile.ZIP_STORED)
+                yield sink.drain()
+
+            zip_file.writestr("cards.json", json.dumps(cards_json, indent=2))
+
+        # cards.json and the central directory, written when the ZipFile closes
+        yield sink.drain()
+    finally:
+        # Client disconnected mid-stream; stop outstanding downloads
+        for task in tasks:
+            task.cancel()
 
 
 @router.post("/api/columns/{col_id}/download")
@@ -978,8 +1750,9 @@ async def download_column(col_id: str, request: dict):
     """
     Download a column as a zip file containing:
     - cards.json: metadata for all cards in the column
-    - content/: directory with numbered PNG files (1.png, 2.png, etc.)
-      - If card has media_url, download the actual media file
+    - content/: directory with numbered files (1.jpg, 2.png, etc.)
+      - If card has media_url, download the actual media file, named
+        with the extension of its content type
       - If card has no media_url, generate a color PNG
 
     Request body should contain:
@@ -987,61 +1760,23 @@ async def download_column(col_id: str, request: dict):
     - columnTitle: title of the column
     """
     try:
-        import httpx
-
         column_cards = request.get("columnCards", [])
         column_title = request.get("columnTitle", "column")
 
         if not column_cards:
             raise HTTPException(status_code=400, detail="No cards provided")
 
-        # Create in-memory zip file
-        zip_buffer = io.BytesIO()
-
-        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-            # Build cards.json
-            cards_json = []
-            for idx, card in enumerate(column_cards, start=1):
-                cards_json.append({
-                    "id": idx,
-                    "cardId": card.get("cardId"),
-                    "title": card.get("title"),
-                    "color": card.get("color"),
-                    "prompt": card.get("prompt", ""),
-                    "source": f"content/{idx}.png"
-                })
-
-            # Write cards.json to zip
-            zip_file.writestr("cards.json", json.dumps(cards_json, indent=2))
-
-            # Generate content for each card
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                for idx, card in enumerate(column_cards, start=1):
-                    media_url = card.get("media_url")
-
-                    if media_url:
-                        # Download the actual media file
-                        try:
-                            logger.info(f"Downloading media for card {idx}: {media_url}")
-                            response = await client.get(media_url)
-                            response.raise_for_status()
-
-                            # Add downloaded media to zip as PNG
-                            # (Note: This assumes the media_url points to an image)
-                            zip_file.writestr(f"content/{idx}.png", response.content)
-                            logger.info(f"Downloaded media for card {idx} ({len(response.content)} bytes)")
-                        except Exception as e:
-                            logger.warning(f"Failed to download media for card {idx}: {e}, falling back to color PNG")
-                            # Fall back to generating color PNG
-                            img_buffer = _generate_color_png(card.get("color", "#CCCCCC"))
-                            zip_file.writestr(f"content/{idx}.png", img_buffer.getvalue())
-                    else:
-                        # Generate color PNG for cards without media
-                        img_buffer = _generate_color_png(card.get("color", "#CCCCCC"))
-                        zip_file.writestr(f"content/{idx}.png", img_buffer.getvalue())
-
-        # Prepare zip for download
-        zip_buffer.seek(0)
+        # Build cards.json
+        cards_json = []
+        for idx, card in enumerate(column_cards, start=1):
+            cards_json.append({
+                "id": idx,
+                "cardId": card.get("cardId"),
+                "title": card.get("title"),
+                "color": card.get("color"),
+                "prompt": card.get("prompt", ""),
+                # "source" is filled in as each entry is written
+            })
 
         # Sanitize column title for filename
         safe_title = "".join(c for c in column_title if c.isalnum() or c in (' ', '-', '_')).strip()
@@ -1051,10 +1786,10 @@ async def download_column(col_id: str, request: dict):
 
         filename = f"{safe_title}.zip"
 
-        logger.info(f"Generated zip for column {col_id}: {len(column_cards)} cards")
+        logger.info(f"Streaming zip for column {col_id}: {len(column_cards)} cards")
 
         return StreamingResponse(
-            io.BytesIO(zip_buffer.getvalue()),
+            _stream_column_zip(column_cards, cards_json),
             media_type="application/zip",
             headers={"Content-Disposition": f"attachment; filename={filename}"}
         )
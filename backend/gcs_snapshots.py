@@ -1,15 +1,114 @@
 """GCS snapshot loading and saving for Yjs documents."""
+import asyncio
+import concurrent.futures
+import functools
 import logging
 from google.cloud import storage
-from y_py import YDoc, apply_update, encode_state_as_update
+from google.cloud.exceptions import NotFound
+from y_py import YDoc, apply_update, encode_state_as_update, encode_state_vector
 
 logger = logging.getLogger(__name__)
 
+# Blob deletes in flight at once when clearing snapshots and deltas
+GCS_DELETE_CONCURRENCY = 16
 
-def load_snapshot(bucket_name: str, sheet_id: str, ydoc: YDoc) -> bool:
+# Between full snapshots, saves upload only the delta since the previous
+# save; after this many deltas the next save rewrites the full snapshot
+SNAPSHOT_COMPACT_EVERY = 50
+
+# Per-sheet save state: {sheet_id: {"generation", "state_vector", "seq"}}.
+# generation is the GCS generation of the snapshot the deltas build on, so
+# deltas left over from an older (or deleted) snapshot are never applied.
+_save_state = {}
+
+
+def _snapshot_path(sheet_id: str) -> str:
+    """Return the blob path of a sheet's full snapshot."""
+    return f"sheets/{sheet_id}/snapshot.ybin"
+
+
+def _delta_prefix(sheet_id: str, generation: int) -> str:
+    """Return the blob prefix holding deltas on top of one snapshot generation."""
+    return f"{_deltas_root(sheet_id)}{generation}/"
+
+
+def _deltas_root(sheet_id: str) -> str:
+    """Return the blob prefix holding a sheet's deltas across all generations."""
+    return f"sheets/{sheet_id}/deltas/"
+
+
+def reset_snapshot_state(sheet_id: str = None):
+    """
+    Forget save state so the next save writes a full snapshot.
+
+    Must be called whenever a snapshot is deleted out from under a live
+    room, otherwise later saves would write deltas against a missing base.
+
+    Args:
+        sheet_id: Sheet to reset, or None to reset every sheet
+    """
+    if sheet_id is None:
+        _save_state.clear()
+    else:
+        _save_state.pop(sheet_id, None)
+
+
+@functools.lru_cache(maxsize=1)
+def _client() -> storage.Client:
+    """Return the shared GCS client (built once; reads credentials and opens a session)."""
+    return storage.Client()
+
+
+@functools.lru_cache(maxsize=8)
+def _bucket(bucket_name: str) -> storage.Bucket:
+    """Return a cached handle for a bucket on the shared client."""
+    return _client().bucket(bucket_name)
+
+
+def _download(blob: storage.Blob) -> bytes:
+    """
+    Download a snapshot or delta blob as stored.
+
+    Skips the client-side CRC32C pass (pure Python when google-crc32c has no
+    C extension) and any gzip decoding; updates are written without a
+    Content-Encoding, so the raw bytes are the update itself.
+    """
+    return blob.download_as_bytes(checksum=None, raw_download=True)
+
+
+def _fetch_snapshot(bucket_name: str, sheet_id: str):
+    """
+    Download a sheet's snapshot and the deltas saved on top of it (blocking).
+
+    Args:
+        bucket_name: GCS bucket name
+        sheet_id: Sheet identifier (used as room name)
+
+    Returns:
+        Tuple of (generation, snapshot bytes, [(delta name, delta bytes), ...])
+        with deltas in save order, or None if the sheet has no snapshot
+    """
+    bucket = _bucket(bucket_name)
+    blob = bucket.get_blob(_snapshot_path(sheet_id))
+    if blob is None:
+        return None
+
+    snapshot_data = _download(blob)
+    deltas = sorted(
+        bucket.list_blobs(prefix=_delta_prefix(sheet_id, blob.generation)),
+        key=lambda delta: delta.name
+    )
+    return blob.generation, snapshot_data, [(delta.name, _download(delta)) for delta in deltas]
+
+
+async def load_snapshot(bucket_name: str, sheet_id: str, ydoc: YDoc) -> bool:
     """
     Load a Yjs snapshot from GCS and apply it to the provided YDoc.
 
+    The downloads run in a worker thread so the event loop keeps relaying
+    for other rooms; the updates are applied on the calling (event loop)
+    thread, since YDoc is not thread-safe.
+
     Args:
         bucket_name: GCS bucket name
         sheet_id: Sheet identifier (used as room name)
@@ -19,37 +118,39 @@ def load_snapshot(bucket_name: str, sheet_id: str, ydoc: YDoc) -> bool:
         True if snapshot was loaded successfully, False otherwise
     """
     try:
-        client = storage.Client()
-        bucket = client.bucket(bucket_name)
-        blob = bucket.blob(f"sheets/{sheet_id}/snapshot.ybin")
-
-        if not blob.exists():
-            logger.info(f"No snapshot found for sheet {sheet_id}")
-            return False
+        fetched = await asyncio.to_thread(_fetch_snapshot, bucket_name, sheet_id)
+    except Exception as e:
+        logger.error(f"Error loading snapshot for sheet {sheet_id}: {e}")
+        return False
 
-        # Download the binary snapshot
-        snapshot_data = blob.download_as_bytes()
+    if fetched is None:
+        logger.info(f"No snapshot found for sheet {sheet_id}")
+        return False
+    generation, snapshot_data, deltas = fetched
 
-        # Apply the update to the YDoc
+    # Apply the updates to the YDoc
+    try:
+        apply_update(ydoc, snapshot_data)
+        for _, delta_data in deltas:
+            apply_update(ydoc, delta_data)
+        _save_state[sheet_id] = {
+            "generation": generation,
+            "state_vector": encode_state_vector(ydoc),
+            "seq": int(deltas[-1][0].rsplit('/', 1)[-1].split('.')[0]) if deltas else 0,
+        }
+        logger.info(f"Loaded snapshot for sheet {sheet_id} ({len(snapshot_data)} bytes, {len(deltas)} deltas)")
+        return True
+    except Exception as apply_error:
+        # Snapshot is corrupted or incompatible (e.g., out of bounds errors from deleted cards)
+        # Delete ALL snapshots to ensure clean state across all sheets
+        logger.error(f"Failed to apply snapshot for sheet {sheet_id}: {apply_error}")
+        logger.warning(f"This likely means snapshots are incompatible with current schema")
+        logger.info(f"Deleting ALL snapshots from GCS bucket to start fresh")
         try:
-            apply_update(ydoc, snapshot_data)
-            logger.info(f"Loaded snapshot for sheet {sheet_id} ({len(snapshot_data)} bytes)")
-            return True
-        except Exception as apply_error:
-            # Snapshot is corrupted or incompatible (e.g., out of bounds errors from deleted cards)
-            # Delete ALL snapshots to ensure clean state across all sheets
-            logger.error(f"Failed to apply snapshot for sheet {sheet_id}: {apply_error}")
-            logger.warning(f"This likely means snapshots are incompatible with current schema")
-            logger.info(f"Deleting ALL snapshots from GCS bucket to start fresh")
-            try:
-                delete_all_snapshots(bucket_name)
-                logger.info(f"Successfully deleted all snapshots - all sheets will start fresh")
-            except Exception as delete_error:
-                logger.error(f"Failed to delete all snapshots: {delete_error}")
-            return False
-
-    except Exception as e:
-        logger.error(f"Error loading snapshot for sheet {sheet_id}: {e}")
+            await asyncio.to_thread(delete_all_snapshots, bucket_name)
+            logger.info(f"Successfully deleted all snapshots - all sheets will start fresh")
+        except Exception as delete_error:
+            logger.error(f"Failed to delete all snapshots: {delete_error}")
         return False
 
 
@@ -67,8 +168,7 @@ def delete_all_snapshots(bucket_name: str) -> bool:
         True if all snapshots were deleted successfully, False otherwise
     """
     try:
-        client = storage.Client()
-        bucket = client.bucket(bucket_name)
+        bucket = _bucket(bucket_name)
 
         # List all blobs in the sheets/ prefix
         blobs = list(bucket.list_blobs(prefix="sheets/"))
@@ -77,16 +177,10 @@ def delete_all_snapshots(bucket_name: str) -> bool:
             logger.info("No snapshots found to delete")
             return True
 
-        # Delete all snapshot blobs
-        deleted_count = 0
-        for blob in blobs:
-            try:
-                blob.delete()
-                deleted_count += 1
-                logger.info(f"Deleted snapshot: {blob.name}")
-            except Exception as blob_error:
-                logger.warning(f"Failed to delete blob {blob.name}: {blob_error}")
+        # Delete all snapshot blobs, several requests in flight
+        deleted_count = _delete_blobs(blobs)
 
+        reset_snapshot_state()
         logger.info(f"Deleted {deleted_count} snapshot(s) from GCS bucket {bucket_name}")
         return True
 
@@ -95,10 +189,22 @@ def delete_all_snapshots(bucket_name: str) -> bool:
         return False
 
 
-def save_snapshot(bucket_name: str, sheet_id: str, ydoc: YDoc) -> bool:
+async def save_snapshot(bucket_name: str, sheet_id: str, ydoc: YDoc) -> bool:
     """
     Save a Yjs document snapshot to GCS.
 
+    Most saves upload only the update since the previous save, as
+    sheets/<id>/deltas/<generation>/<seq>.ybin; every SNAPSHOT_COMPACT_EVERY
+    deltas (or when there is no known base) the full state is written to
+    snapshot.ybin instead, which starts a new generation. Bursty edits
+    therefore cost a few small PUTs rather than repeated full uploads.
+
+    The state is encoded on the calling (event loop) thread, since YDoc is
+    not thread-safe; the upload itself runs in a worker thread so it never
+    blocks the loop. Client-side checksumming is skipped: the snapshot is
+    rewritten on every debounced change and a multi-MB CRC32C/MD5 pass in
+    Python costs more than it protects.
+
     Args:
         bucket_name: GCS bucket name
         sheet_id: Sheet identifier (used as room name)
@@ -107,20 +213,131 @@ def save_snapshot(bucket_name: str, sheet_id: str, ydoc: YDoc) -> bool:
     Returns:
         True if snapshot was saved successfully, False otherwise
     """
+    state = _save_state.get(sheet_id)
     try:
-        client = storage.Client()
-        bucket = client.bucket(bucket_name)
-        blob = bucket.blob(f"sheets/{sheet_id}/snapshot.ybin")
+        bucket = _bucket(bucket_name)
+
+        if state is None or state["seq"] >= SNAPSHOT_COMPACT_EVERY:
+            # Full snapshot: encode the whole state
+            snapshot_data = encode_state_as_update(ydoc)
+            state_vector = encode_state_vector(ydoc)
+            blob = bucket.blob(_snapshot_path(sheet_id))
+            await asyncio.to_thread(
+                blob.upload_from_string,
+                snapshot_data,
+                content_type="application/octet-stream",
+                checksum=None,
+            )
+            _save_state[sheet_id] = {"generation": blob.generation, "state_vector": state_vector, "seq": 0}
 
-        # Encode the current state as binary update
-        snapshot_data = encode_state_as_update(ydoc)
+            # Deltas of older generations are now folded into the snapshot.
+            # After a reset or failed save the previous generation is unknown,
+            # so clear every generation but the new one.
+            await asyncio.to_thread(
+                _delete_prefix, bucket, _deltas_root(sheet_id), _delta_prefix(sheet_id, blob.generation)
+            )
 
-        # Upload to GCS
-        blob.upload_from_string(snapshot_data, content_type="application/octet-stream")
+            logger.info(f"Saved snapshot for sheet {sheet_id} ({len(snapshot_data)} bytes)")
+            return True
+
+        # Delta: only what changed since the previous save. Claim the sequence
+        # number before awaiting so an overlapping save can't reuse it.
+        delta_data = encode_state_as_update(ydoc, state["state_vector"])
+        state["state_vector"] = encode_state_vector(ydoc)
+        state["seq"] += 1
+        blob = bucket.blob(f"{_delta_prefix(sheet_id, state['generation'])}{state['seq']:06d}.ybin")
+        await asyncio.to_thread(
+            blob.upload_from_string,
+            delta_data,
+            content_type="application/octet-stream",
+            checksum=None,
+        )
 
-        logger.info(f"Saved snapshot for sheet {sheet_id} ({len(snapshot_data)} bytes)")
+        logger.info(f"Saved snapshot delta {state['seq']} for sheet {sheet_id} ({len(delta_data)} bytes)")
         return True
 
     except Exception as e:
+        # A lost snapshot or delta breaks the chain; make the next save a full one
+        reset_snapshot_state(sheet_id)
         logger.error(f"Error saving snapshot for sheet {sheet_id}: {e}")
         return False
+
+
+def _delete_blob(blob: storage.Blob) -> bool:
+    """
+    Delete one blob (best effort).
+
+    Args:
+        blob: Blob to delete
+
+    Returns:
+        True if the blob was deleted, False if it was already gone or the delete failed
+    """
+    try:
+        blob.delete()
+        return True
+    except NotFound:
+        return False
+    except Exception as e:
+        logger.warning(f"Failed to delete {blob.name}: {e}")
+        return False
+
+
+def _delete_blobs(blobs: list) -> int:
+    """
+    Delete blobs concurrently, up to GCS_DELETE_CONCURRENCY at a time.
+
+    Blobs that are already gone are skipped, and one failed delete doesn't
+    stop the others.
+
+    Args:
+        blobs: Blob objects to delete
+
+    Returns:
+        Number of blobs actually deleted
+    """
+    if not blobs:
+        return 0
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(GCS_DELETE_CONCURRENCY, len(blobs))) as pool:
+        return sum(pool.map(_delete_blob, blobs))
+
+
+def delete_sheet_deltas(bucket_name: str, sheet_id: str) -> int:
+    """
+    Delete every delta saved for a sheet, across all generations (blocking).
+
+    Call alongside deleting the sheet's snapshot; deltas of a deleted
+    generation are never read again.
+
+    Args:
+        bucket_name: GCS bucket name
+        sheet_id: Sheet identifier
+
+    Returns:
+        Number of delta blobs deleted
+    """
+    return _delete_prefix(_bucket(bucket_name), _deltas_root(sheet_id))
+
+
+def _delete_prefix(bucket: storage.Bucket, prefix: str, keep: str = None) -> int:
+    """
+    Delete every blob under a prefix (best effort).
+
+    Args:
+        bucket: GCS bucket handle
+        prefix: Blob name prefix
+        keep: Optional narrower prefix whose blobs are left in place
+
+    Returns:
+        Number of blobs deleted
+    """
+    deleted_count = 0
+    try:
+        blobs = [
+            blob for blob in bucket.list_blobs(prefix=prefix)
+            if keep is None or not blob.name.startswith(keep)
+        ]
+        deleted_count = _delete_blobs(blobs)
+    except Exception as e:
+        logger.warning(f"Failed to delete blobs under {prefix}: {e}")
+    return deleted_count
@@ -1,26 +1,60 @@
 """Media utilities for image/video processing and storage."""
 import io
 import logging
+import os
+import re
+import shutil
+import subprocess
+import tempfile
 from datetime import datetime
-from typing import Tuple, Optional
+from typing import BinaryIO, Tuple, Optional
 from PIL import Image
 from google.cloud import storage
 
+# libvips (SIMD deflate, streaming pipeline) comes with pyvips[binary] in
+# requirements.txt; fall back to Pillow if it can't be loaded
+try:
+    import pyvips
+except (ImportError, OSError):
+    pyvips = None
+
 logger = logging.getLogger(__name__)
 
+if pyvips is None:
+    # Thumbnails still work, but decode at full resolution; make that visible
+    logger.warning("libvips not available; thumbnails fall back to Pillow")
+
+# Original (non-thumbnail) media paths produced by generate_media_path
+MEDIA_PATH_PATTERN = re.compile(r"^media/[^/]+/\d{2}-\d{2}-\d{4}/[0-9A-Z]{26}\.[a-z0-9]+$")
+
+# Namespace for uploads that aren't tied to a sheet
+UNSCOPED_MEDIA_ID = "_unscoped"
 
-def generate_media_path(file_id: str, extension: str, is_thumbnail: bool = False) -> str:
+# Chunk size for resumable uploads and temp-file spooling (multiple of 256KB)
+UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024
+
+
+def generate_media_path(
+    file_id: str,
+    extension: str,
+    is_thumbnail: bool = False,
+    sheet_id: Optional[str] = None
+) -> str:
     """
-    Generate date-based GCS path for media file.
-    Format: mm-dd-yyyy/ULID.ext or mm-dd-yyyy/ULID_thumb.ext
+    Generate sheet-scoped, date-based GCS path for media file.
+    Format: media/SHEET/mm-dd-yyyy/ULID.ext or media/SHEET/mm-dd-yyyy/ULID_thumb.ext
+
+    Scoping by sheet lets a sheet's media be listed and deleted by prefix
+    without touching other sheets.
 
     Args:
         file_id: Unique file identifier (ULID)
         extension: File extension (e.g., "png", "jpg", "mp4")
         is_thumbnail: Whether this is a thumbnail
+        sheet_id: Owning sheet (None for uploads not tied to a sheet)
 
     Returns:
-        str: GCS blob path (e.g., "01-15-2025/abc123.png")
+        str: GCS blob path (e.g., "media/sheet-1/01-15-2025/abc123.png")
     """
     # Get current date in mm-dd-yyyy format
     date_prefix = datetime.now().strftime("%m-%d-%Y")
@@ -29,7 +63,97 @@ def generate_media_path(file_id: str, extension: str, is_thumbnail: bool = False
     suffix = "_thumb" if is_thumbnail else ""
 
     # Build path
-    return f"{date_prefix}/{file_id}{suffix}.{extension}"
+    return f"{media_prefix(sheet_id)}{date_prefix}/{file_id}{suffix}.{extension}"
+
+
+def thumbnail_path_for(media_path: str) -> str:
+    """
+    Return the thumbnail path that sits next to an original media path.
+
+    Args:
+        media_path: Original media path from generate_media_path
+
+    Returns:
+        str: Matching PNG thumbnail path (e.g., "media/s/01-15-2025/abc123_thumb.png")
+    """
+    return f"{media_path.rsplit('.', 1)[0]}_thumb.png"
+
+
+def media_prefix(sheet_id: Optional[str] = None) -> str:
+    """
+    Return the GCS prefix holding all media for a sheet.
+
+    Args:
+        sheet_id: Sheet identifier (None for uploads not tied to a sheet)
+
+    Returns:
+        str: Blob name prefix ending in "/" (e.g., "media/sheet-1/")
+    """
+    return f"media/{sheet_id or UNSCOPED_MEDIA_ID}/"
+
+
+def is_media_path(path: str) -> bool:
+    """
+    Check if a blob path is an original media path from generate_media_path.
+
+    Used to validate client-supplied paths so they can't point at
+    snapshots, card JSON, or thumbnails.
+
+    Args:
+        path: GCS blob path
+
+    Returns:
+        bool: True if path matches the original media path format
+    """
+    return bool(MEDIA_PATH_PATTERN.match(path))
+
+
+def encode_png(img: Image.Image) -> bytes:
+    """
+    Encode an RGB image as PNG.
+
+    Uses libvips when available, whose deflate is several times faster than
+    Pillow's zlib at a similar ratio; otherwise falls back to Pillow.
+
+    Args:
+        img: RGB image to encode
+
+    Returns:
+        bytes: PNG data
+    """
+    if pyvips is not None:
+        width, height = img.size
+        vips_img = pyvips.Image.new_from_memory(img.tobytes(), width, height, 3, 'uchar')
+        return vips_img.write_to_buffer('.png', compression=1)
+
+    # optimize=True forces level 9 plus extra passes; thumbnails are small
+    # and short-lived, so level 1 is the better trade
+    output = io.BytesIO()
+    img.save(output, format='PNG', compress_level=1)
+    return output.getvalue()
+
+
+def _flatten_to_rgb(img: Image.Image) -> Image.Image:
+    """
+    Convert an image to RGB, compositing any transparency onto white.
+
+    Args:
+        img: Image in any Pillow mode
+
+    Returns:
+        Image.Image: RGB image
+    """
+    if img.mode == 'P':
+        # Palette images only carry alpha through a transparency entry
+        img = img.convert('RGBA' if 'transparency' in img.info else 'RGB')
+
+    if img.mode in ('RGBA', 'LA'):
+        background = Image.new('RGBA', img.size, (255, 255, 255, 255))
+        return Image.alpha_composite(background, img.convert('RGBA')).convert('RGB')
+
+    if img.mode != 'RGB':
+        return img.convert('RGB')
+    return img
 
 
 def create_thumbnail(image_data: bytes, max_size: int = 512) -> bytes:
@@ -44,20 +168,19 @@ def create_thumbnail(image_data: bytes, max_size: int = 512) -> bytes:
     Returns:
         bytes: PNG thumbnail data
     """
+    if pyvips is not None:
+        try:
+            return _vips_thumbnail(image_data, max_size)
+        except pyvips.Error as e:
+            # Formats libvips can't load still go through Pillow below
+            logger.info(f"libvips thumbnail failed, falling back to Pillow: {e}")
+
     try:
         # Open image from bytes
         img = Image.open(io.BytesIO(image_data))
 
         # Convert to RGB if necessary (handles RGBA, P, etc.)
-        if img.mode in ('RGBA', 'LA', 'P'):
-            # Create white background
-            background = Image.new('RGB', img.size, (255, 255, 255))
-            if img.mode == 'P':
-                img = img.convert('RGBA')
-            background.paste(img, mask=img.split()[-1] if img.mode in ('RGBA', 'LA') else None)
-            img = background
-        elif img.mode != 'RGB':
-            img = img.convert('RGB')
+        img = _flatten_to_rgb(img)
 
         # Calculate new size maintaining aspect ratio
         width, height = img.size
@@ -71,19 +194,41 @@ def create_thumbnail(image_data: bytes, max_size: int = 512) -> bytes:
         # Resize image
         img_resized = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
 
-        # Save to bytes
-        output = io.BytesIO()
-        img_resized.save(output, format='PNG', optimize=True)
-        output.seek(0)
-
         logger.info(f"Created thumbnail: {width}x{height} -> {new_width}x{new_height}")
-        return output.getvalue()
+        return encode_png(img_resized)
 
     except Exception as e:
         logger.error(f"Error creating thumbnail: {e}")
         raise
 
 
+def _vips_thumbnail(image_data: bytes, max_size: int) -> bytes:
+    """
+    Create a thumbnail with libvips shrink-on-load.
+
+    thumbnail_buffer lets the loader downsample while decoding (JPEG DCT
+    scaling, WebP/TIFF pyramid levels) and reads sequentially, so the
+    full-resolution pixels are never held in memory.
+
+    Args:
+        image_data: Original image bytes
+        max_size: Maximum width/height for thumbnail
+
+    Returns:
+        bytes: PNG thumbnail data
+    """
+    thumb = pyvips.Image.thumbnail_buffer(image_data, max_size, height=max_size, size='down')
+
+    # Match the Pillow path: alpha flattened onto white, 8-bit sRGB
+    if thumb.hasalpha():
+        thumb = thumb.flatten(background=255)
+    if thumb.interpretation != 'srgb':
+        thumb = thumb.colourspace('srgb')
+
+    logger.info(f"Created thumbnail: {thumb.width}x{thumb.height} (libvips)")
+    return thumb.write_to_buffer('.png', compression=1)
+
+
 def get_image_dimensions(image_data: bytes) -> Tuple[int, int]:
     """
     Get image dimensions.
@@ -102,9 +247,25 @@ def get_image_dimensions(image_data: bytes) -> Tuple[int, int]:
         raise
 
 
+def make_blob_public(blob: storage.Blob):
+    """
+    Make an uploaded blob publicly readable.
+
+    With uniform bucket-level access, public reads come from the bucket's
+    IAM policy and per-object ACL calls are rejected, so this is a no-op and
+    saves a round-trip per upload. The flag is only known once the bucket's
+    metadata has been loaded (see init_clients); until then the object ACL
+    is set as before.
+
+    Args:
+        blob: Uploaded blob
+    """
+    if not blob.bucket.iam_configuration.uniform_bucket_level_access_enabled:
+        blob.make_public()
+
+
 def upload_to_gcs(
-    gcs_client: storage.Client,
-    bucket_name: str,
+    bucket: storage.Bucket,
     blob_path: str,
     data: bytes,
     content_type: str
@@ -113,8 +274,7 @@ def upload_to_gcs(
     Upload data to Google Cloud Storage.
 
     Args:
-        gcs_client: GCS client instance
-        bucket_name: GCS bucket name
+        bucket: GCS bucket handle (reused across uploads)
         blob_path: Path within bucket (e.g., "media/abc123.png")
         data: File data as bytes
         content_type: MIME type (e.g., "image/png")
@@ -123,14 +283,55 @@ def upload_to_gcs(
         str: Public URL to the uploaded file
     """
     try:
-        bucket = gcs_client.bucket(bucket_name)
         blob = bucket.blob(blob_path)
 
-        # Upload with content type
-        blob.upload_from_string(data, content_type=content_type)
+        # Upload with content type; skip the client-side MD5/CRC32C pass
+        blob.upload_from_string(data, content_type=content_type, checksum=None)
 
         # Make publicly accessible
-        blob.make_public()
+        make_blob_public(blob)
+
+        # Return public URL
+        public_url = blob.public_url
+        logger.info(f"Uploaded to GCS: {blob_path} -> {public_url}")
+
+        return public_url
+
+    except Exception as e:
+        logger.error(f"Error uploading to GCS: {e}")
+        raise
+
+
+def upload_file_to_gcs(
+    bucket: storage.Bucket,
+    blob_path: str,
+    file_path: str,
+    content_type: str
+) -> str:
+    """
+    Upload a local file to Google Cloud Storage in fixed-size chunks.
+
+    Setting chunk_size makes the client use a resumable upload that reads
+    and sends UPLOAD_CHUNK_SIZE bytes at a time, so memory use stays flat
+    regardless of file size.
+
+    Args:
+        bucket: GCS bucket handle (reused across uploads)
+        blob_path: Path within bucket (e.g., "media/abc123.mp4")
+        file_path: Path to the file on local disk
+        content_type: MIME type (e.g., "video/mp4")
+
+    Returns:
+        str: Public URL to the uploaded file
+    """
+    try:
+        blob = bucket.blob(blob_path, chunk_size=UPLOAD_CHUNK_SIZE)
+
+        # Resumable upload with content type
+        blob.upload_from_filename(file_path, content_type=content_type, checksum=None)
+
+        # Make publicly accessible
+        make_blob_public(blob)
 
         # Return public URL
         public_url = blob.public_url
@@ -143,6 +344,46 @@ def upload_to_gcs(
         raise
 
 
+def spool_to_tempfile(file_obj: BinaryIO, suffix: str = '') -> str:
+    """
+    Copy a file-like object to a named temp file in UPLOAD_CHUNK_SIZE pieces.
+
+    The caller owns the returned path and must unlink it.
+
+    Args:
+        file_obj: Readable binary file object (e.g., UploadFile.file)
+        suffix: Temp file suffix (e.g., ".mp4")
+
+    Returns:
+        str: Path to the temp file
+    """
+    file_obj.seek(0)
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as temp_file:
+        shutil.copyfileobj(file_obj, temp_file, UPLOAD_CHUNK_SIZE)
+        return temp_file.name
+
+
+CONTENT_TYPES = {
+    'jpg': 'image/jpeg',
+    'jpeg': 'image/jpeg',
+    'png': 'image/png',
+    'gif': 'image/gif',
+    'webp': 'image/webp',
+    'mp4': 'video/mp4',
+    'mov': 'video/quicktime',
+    'avi': 'video/x-msvideo',
+    'webm': 'video/webm',
+}
+VIDEO_EXTENSIONS = frozenset({'mp4', 'mov', 'avi', 'webm', 'mkv', 'flv', 'm4v'})
+IMAGE_EXTENSIONS = frozenset({'jpg', 'jpeg', 'png', 'gif', 'webp', 'bmp', 'tiff', 'tif'})
+
+
+def _extension(filename: str) -> str:
+    """Return the lowercased text after the last '.', or '' if there is none."""
+    _, dot, ext = filename.rpartition('.')
+    return ext.lower() if dot else ''
+
+
 def get_content_type(filename: str) -> str:
     """
     Determine content type from filename.
@@ -153,21 +394,7 @@ def get_content_type(filename: str) -> str:
     Returns:
         str: MIME type
     """
-    ext = filename.lower().split('.')[-1] if '.' in filename else ''
-
-    content_types = {
-        'jpg': 'image/jpeg',
-        'jpeg': 'image/jpeg',
-        'png': 'image/png',
-        'gif': 'image/gif',
-        'webp': 'image/webp',
-        'mp4': 'video/mp4',
-        'mov': 'video/quicktime',
-        'avi': 'video/x-msvideo',
-        'webm': 'video/webm',
-    }
-
-    return content_types.get(ext, 'application/octet-stream')
+    return CONTENT_TYPES.get(_extension(filename), 'application/octet-stream')
 
 
 def is_video(filename: str) -> bool:
@@ -180,9 +407,7 @@ def is_video(filename: str) -> bool:
     Returns:
         bool: True if video file
     """
-    ext = filename.lower().split('.')[-1] if '.' in filename else ''
-    video_exts = {'mp4', 'mov', 'avi', 'webm', 'mkv', 'flv', 'm4v'}
-    return ext in video_exts
+    return _extension(filename) in VIDEO_EXTENSIONS
 
 
 def is_image(filename: str) -> bool:
@@ -195,18 +420,41 @@ def is_image(filename: str) -> bool:
     Returns:
         bool: True if image file
     """
-    ext = filename.lower().split('.')[-1] if '.' in filename else ''
-    image_exts = {'jpg', 'jpeg', 'png', 'gif', 'webp', 'bmp', 'tiff', 'tif'}
-    return ext in image_exts
+    return _extension(filename) in IMAGE_EXTENSIONS
 
 
-def create_video_thumbnail(video_data: bytes, max_size: int = 512) -> bytes:
+def _extract_video_frame(video_path: str) -> bytes:
     """
-    Create a thumbnail from video by extracting first frame at 0.1 seconds.
+    Extract the frame at 0.1 seconds as JPEG bytes, reading the frame from ffmpeg's stdout.
+
+    Args:
+        video_path: Path to the video file on local disk
+
+    Returns:
+        bytes: JPEG frame data
+
+    Raises:
+        subprocess.CalledProcessError: If ffmpeg extraction fails
+    """
+    # -ss before -i seeks on the input (fast seek); 0.1s avoids black first frames
+    proc = subprocess.run([
+        'ffmpeg', '-threads', '1', '-ss', '0.1', '-i', video_path,
+        '-vframes', '1', '-q:v', '2',
+        '-f', 'image2', '-vcodec', 'mjpeg', 'pipe:1'
+    ], check=True, capture_output=True)
+
+    if not proc.stdout:
+        raise subprocess.CalledProcessError(proc.returncode, proc.args, proc.stdout, proc.stderr or b'no frame decoded')
+    return proc.stdout
+
+
+def create_video_thumbnail_from_file(video_path: str, max_size: int = 512) -> bytes:
+    """
+    Create a thumbnail from a video file by extracting first frame at 0.1 seconds.
     Fits within max_size x max_size box, preserving aspect ratio.
 
     Args:
-        video_data: Original video bytes
+        video_path: Path to the video file on local disk
         max_size: Maximum width/height for thumbnail (default 512)
 
     Returns:
@@ -215,75 +463,49 @@ def create_video_thumbnail(video_data: bytes, max_size: int = 512) -> bytes:
     Raises:
         Exception: If ffmpeg extraction fails
     """
-    import subprocess
-    import tempfile
-    import os
-
     try:
-        # Write video to temp file
-        with tempfile.NamedTemporaryFile(suffix='.mp4', delete=False) as temp_video:
-            video_path = temp_video.name
-            temp_video.write(video_data)
-
-        try:
-            # Extract first frame using ffmpeg (at 0.1s to avoid black frames)
-            thumbnail_path = video_path.replace('.mp4', '_thumb.jpg')
-
-            # Use ffmpeg to extract frame
-            subprocess.run([
-                'ffmpeg', '-ss', '0.1', '-i', video_path,
-                '-vframes', '1', '-q:v', '2',
-                thumbnail_path
-            ], check=True, capture_output=True, stderr=subprocess.PIPE)
-
-            # Read the extracted frame
-            with open(thumbnail_path, 'rb') as thumb_file:
-                frame_data = thumb_file.read()
-
-            # Use PIL to resize it to fit within max_size box (same as image thumbnails)
-            img = Image.open(io.BytesIO(frame_data))
-
-            # Convert to RGB if necessary
-            if img.mode in ('RGBA', 'LA', 'P'):
-                background = Image.new('RGB', img.size, (255, 255, 255))
-                if img.mode == 'P':
-                    img = img.convert('RGBA')
-                background.paste(img, mask=img.split()[-1] if img.mode in ('RGBA', 'LA') else None)
-                img = background
-            elif img.mode != 'RGB':
-                img = img.convert('RGB')
-
-            # Calculate new size maintaining aspect ratio
-            width, height = img.size
-            if width > height:
-                new_width = min(width, max_size)
-                new_height = int(height * (new_width / width))
-            else:
-                new_height = min(height, max_size)
-                new_width = int(width * (new_height / height))
-
-            # Resize image
-            img_resized = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-
-            # Save to bytes
-            output = io.BytesIO()
-            img_resized.save(output, format='PNG', optimize=True)
-            output.seek(0)
-
-            logger.info(f"Created video thumbnail: {width}x{height} -> {new_width}x{new_height}")
-
-            # Clean up
-            os.unlink(thumbnail_path)
-
-            return output.getvalue()
-
-        finally:
-            # Clean up video file
-            os.unlink(video_path)
-
+        frame_data = _extract_video_frame(video_path)
     except subprocess.CalledProcessError as e:
         logger.error(f"ffmpeg failed: {e.stderr.decode() if e.stderr else 'unknown error'}")
         raise Exception(f"Failed to extract video frame: {e.stderr.decode() if e.stderr else 'unknown error'}")
+
+    return _frame_to_thumbnail(frame_data, max_size)
+
+
+def _frame_to_thumbnail(frame_data: bytes, max_size: int) -> bytes:
+    """
+    Resize an extracted video frame to fit within max_size x max_size and encode as PNG.
+
+    Args:
+        frame_data: JPEG frame bytes from ffmpeg
+        max_size: Maximum width/height for thumbnail
+
+    Returns:
+        bytes: PNG thumbnail data
+    """
+    try:
+        # Use PIL to resize it to fit within max_size box (same as image thumbnails)
+        img = Image.open(io.BytesIO(frame_data))
+
+        # Convert to RGB if necessary
+        img = _flatten_to_rgb(img)
+
+        # Calculate new size maintaining aspect ratio
+        width, height = img.size
+        if width > height:
+            new_width = min(width, max_size)
+            new_height = int(height * (new_width / width))
+        else:
+            new_height = min(height, max_size)
+            new_width = int(width * (new_height / height))
+
+        # Resize image
+        img_resized = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
+
+        logger.info(f"Created video thumbnail: {width}x{height} -> {new_width}x{new_height}")
+
+        return encode_png(img_resized)
+
     except Exception as e:
         logger.error(f"Error creating video thumbnail: {e}")
         raise
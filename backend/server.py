@@ -2,19 +2,20 @@
 import os
 import logging
 import asyncio
+import mimetypes
+from collections import defaultdict
 from pathlib import Path
 from contextlib import asynccontextmanager
 from typing import Any
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, ORJSONResponse, Response
 from ypy_websocket import ASGIServer, WebsocketServer, YRoom
-from y_py import YDoc
 from dotenv import load_dotenv
 
 import cards_api
-from cards_api import router as cards_router, init_clients
+from cards_api import router as cards_router, init_clients, shutdown_clients
 from gcs_snapshots import load_snapshot, save_snapshot, delete_all_snapshots
 
 # Load environment variables from parent directory's .env file
@@ -31,35 +32,41 @@ logger = logging.getLogger(__name__)
 # Get GCS bucket from environment
 GCS_BUCKET = os.getenv("YJS_GCS_BUCKET", "")
 
-# Debounce tracking for snapshots
-snapshot_tasks = {}
+# Cross-origin callers (comma-separated). The built frontend is served by
+# this app, so only the Vite dev server needs CORS by default.
+CORS_ALLOWED_ORIGINS = [
+    origin.strip()
+    for origin in os.getenv("CORS_ALLOWED_ORIGINS", "http://localhost:5173,http://127.0.0.1:5173").split(",")
+    if origin.strip()
+]
 
+# Seconds without changes before a room's snapshot is saved
+SNAPSHOT_DEBOUNCE = 0.8
 
-async def debounced_save_snapshot(sheet_id: str, ydoc: YDoc, delay: float = 0.8):
-    """
-    Debounced snapshot saving - only saves after delay with no new changes.
+# Encoded delete set of a transaction that deleted nothing
+EMPTY_DELETE_SET = b"\x00"
 
-    Args:
-        sheet_id: Sheet identifier
-        ydoc: Y.Doc instance
-        delay: Delay in seconds before saving
-    """
-    # Cancel any existing task for this sheet
-    if sheet_id in snapshot_tasks:
-        snapshot_tasks[sheet_id].cancel()
+# Snapshot uploads run on a fixed pool of writers shared by all rooms; a
+# burst across many rooms waits in the bounded queue instead of starting
+# an upload per room at once
+SNAPSHOT_WRITERS = 4
+SNAPSHOT_QUEUE_SIZE = 64
+snapshot_queue = asyncio.Queue(maxsize=SNAPSHOT_QUEUE_SIZE)
 
-    async def save_task():
+
+async def snapshot_writer():
+    """Save queued room snapshots, one at a time per writer."""
+    while True:
+        room, done = await snapshot_queue.get()
         try:
-            await asyncio.sleep(delay)
-            logger.info(f"Saving debounced snapshot for {sheet_id}")
-            save_snapshot(GCS_BUCKET, sheet_id, ydoc)
-        except asyncio.CancelledError:
-            logger.debug(f"Snapshot save cancelled for {sheet_id}")
+            logger.info("Saving debounced snapshot for %s", room.room_name)
+            await save_snapshot(GCS_BUCKET, room.room_name, room.ydoc)
+        except Exception as e:
+            logger.error("Snapshot writer failed for %s: %s", room.room_name, e)
         finally:
-            if sheet_id in snapshot_tasks:
-                del snapshot_tasks[sheet_id]
-
-    snapshot_tasks[sheet_id] = asyncio.create_task(save_task())
+            if not done.done():
+                done.set_result(None)
+            snapshot_queue.task_done()
 
 
 # Custom YRoom subclass to add snapshot hooks
@@ -70,50 +77,109 @@ class NanosheetRoom(YRoom):
         """Initialize with room name."""
         super().__init__(*args, **kwargs)
         self.room_name = room_name
-        self._snapshot_scheduled = False
+        self.start_lock = asyncio.Lock()
+        # Root types, resolved once instead of by name on every access
+        self.row_order = self.ydoc.get_array('rowOrder')
+        self.col_order = self.ydoc.get_array('colOrder')
+        self.cells = self.ydoc.get_map('cells')
+        self.cards_metadata = self.ydoc.get_map('cardsMetadata')
+        # Occupied row IDs per column, built on first use and then kept in
+        # step with every cells change (local or from clients)
+        self._lane_rows = None
+        self.cells.observe(self._on_cells_change)
+        # Set by observers on every change; the debounce task queues a save
+        # once the room has been quiet for SNAPSHOT_DEBOUNCE seconds
+        self._dirty = asyncio.Event()
+        self._last_dirty = 0.0
+        self._debounce_task = None
+
+    @property
+    def lane_rows(self) -> dict:
+        """Map each column ID to the set of row IDs with a cell in that column."""
+        if self._lane_rows is None:
+            lane_rows = defaultdict(set)
+            for cell_key in self.cells.keys():
+                row_id, _, col_id = cell_key.partition(':')
+                lane_rows[col_id].add(row_id)
+            self._lane_rows = lane_rows
+        return self._lane_rows
+
+    def _on_cells_change(self, event):
+        """Apply a cells change to the lane index, if it has been built."""
+        if self._lane_rows is None:
+            return
+        for cell_key, change in event.keys.items():
+            row_id, _, col_id = cell_key.partition(':')
+            if change["action"] == "delete":
+                self._lane_rows[col_id].discard(row_id)
+            else:
+                self._lane_rows[col_id].add(row_id)
+
+    def stop(self):
+        """Stop the room and its snapshot debounce task."""
+        if self._debounce_task is not None:
+            self._debounce_task.cancel()
+            self._debounce_task = None
+        super().stop()
+
+    async def _debounce_snapshots(self):
+        """Queue a snapshot after each burst of changes, one save at a time."""
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._dirty.wait()
+            # Keep sleeping while changes keep arriving
+            while (remaining := self._last_dirty + SNAPSHOT_DEBOUNCE - loop.time()) > 0:
+                await asyncio.sleep(remaining)
+
+            # Changes made during the save set the flag again for the next pass;
+            # waiting for the save keeps at most one per room in flight
+            self._dirty.clear()
+            done = loop.create_future()
+            await snapshot_queue.put((self, done))
+            await done
 
     async def start(self, **kwargs):
         """Override start to load snapshot and set up observers."""
         # Load snapshot from GCS BEFORE starting (so it's available when clients connect)
         if GCS_BUCKET:
-            logger.info(f"Loading snapshot for room: {self.room_name}")
+            logger.info("Loading snapshot for room: %s", self.room_name)
             try:
-                success = load_snapshot(GCS_BUCKET, self.room_name, self.ydoc)
+                success = await load_snapshot(GCS_BUCKET, self.room_name, self.ydoc)
                 if success:
-                    logger.info(f"Successfully loaded snapshot for room: {self.room_name}")
+                    logger.info("Successfully loaded snapshot for room: %s", self.room_name)
                 else:
-                    logger.info(f"No snapshot found or snapshot was corrupted for room: {self.room_name}")
+                    logger.info("No snapshot found or snapshot was corrupted for room: %s", self.room_name)
             except Exception as e:
-                logger.error(f"Failed to load snapshot for room {self.room_name}: {e}")
-                logger.info(f"Starting with empty document for room: {self.room_name}")
+                logger.error("Failed to load snapshot for room %s: %s", self.room_name, e)
+                logger.info("Starting with empty document for room: %s", self.room_name)
         else:
             logger.warning("GCS_BUCKET not configured, snapshots disabled")
 
-        # Set up observers on specific Y structures (not all transactions)
-        # This avoids triggering on awareness updates
+        # One document-level observer: a transaction touching several
+        # structures marks the room dirty once. Awareness lives outside the
+        # YDoc, so presence updates never reach it.
         if GCS_BUCKET:
             try:
+                loop = asyncio.get_running_loop()
+
                 def on_change(event):
-                    """Called when rowOrder, colOrder, cells, or cardsMetadata change."""
-                    logger.info(f"YDoc structure changed in room: {self.room_name}")
-                    asyncio.create_task(debounced_save_snapshot(self.room_name, self.ydoc))
-
-                # Get the Y structures and observe them
-                row_order = self.ydoc.get_array('rowOrder')
-                col_order = self.ydoc.get_array('colOrder')
-                cells = self.ydoc.get_map('cells')
-                cards_metadata = self.ydoc.get_map('cardsMetadata')
-
-                # Observe each structure
-                row_order.observe(on_change)
-                col_order.observe(on_change)
-                cells.observe(on_change)
-                cards_metadata.observe(on_change)
-
-                logger.info(f"Set up observers for room: {self.room_name}")
+                    """Called after every committed transaction on the document."""
+                    # Reads commit empty transactions too; skip those
+                    if event.before_state == event.after_state and event.delete_set == EMPTY_DELETE_SET:
+                        return
+                    logger.info("YDoc structure changed in room: %s", self.room_name)
+                    self._last_dirty = loop.time()
+                    self._dirty.set()
+
+                self.ydoc.observe_after_transaction(on_change)
+
+                if self._debounce_task is None:
+                    self._debounce_task = asyncio.create_task(self._debounce_snapshots())
+
+                logger.info("Set up snapshot observer for room: %s", self.room_name)
             except Exception as e:
-                logger.error(f"Failed to set up observers for room {self.room_name}: {e}")
-                logger.info(f"Continuing without observers - snapshots will not be saved")
+                logger.error("Failed to set up snapshot observer for room %s: %s", self.room_name, e)
+                logger.info("Continuing without observers - snapshots will not be saved")
 
         # Now start the room
         await super().start(**kwargs)
@@ -124,18 +190,40 @@ class NanosheetServer(WebsocketServer):
     """Custom WebSocket server using NanosheetRoom."""
 
     async def get_room(self, name: str) -> NanosheetRoom:
-        """Override to create our custom room type."""
-        # Strip /yjs/ prefix from room name if present
-        room_name = name.replace('/yjs/', '')
-
-        if name not in self.rooms:
-            self.rooms[name] = NanosheetRoom(
-                room_name=room_name,
+        """Override to create our custom room type, keyed by sheet ID."""
+        # Websocket paths arrive as /yjs/{sheetId}
+        return await self.get_room_by_id(name.removeprefix('/yjs/'))
+
+    async def get_room_by_id(self, sheet_id: str) -> NanosheetRoom:
+        """
+        Get or create the room for a sheet (used by the REST API), started.
+
+        Starting loads the sheet's snapshot, so REST edits apply on top of
+        the persisted state and are saved like any client edit.
+        """
+        room = self.rooms.get(sheet_id)
+        if room is None:
+            room = self.rooms[sheet_id] = NanosheetRoom(
+                room_name=sheet_id,
                 ready=self.rooms_ready,
                 ystore=None,
                 log=self.log,
             )
-        return self.rooms[name]
+        if not room.started.is_set():
+            await self.start_room(room)
+        return room
+
+    def is_room_loaded(self, sheet_id: str) -> bool:
+        """Return True if the sheet's room exists and has been started."""
+        room = self.rooms.get(sheet_id)
+        return room is not None and room.started.is_set()
+
+    async def start_room(self, room: NanosheetRoom):
+        """Start a room once, even when several callers race to start it."""
+        # Snapshot loading awaits I/O before YRoom.start marks the room as
+        # starting, so concurrent starts must be serialized here
+        async with room.start_lock:
+            await super().start_room(room)
 
     async def send(self, message: bytes, room: NanosheetRoom):
         """Override send to catch WebSocket close errors."""
@@ -143,7 +231,7 @@ class NanosheetServer(WebsocketServer):
             await super().send(message, room)
         except RuntimeError as e:
             if "after sending 'websocket.close'" in str(e):
-                logger.debug(f"Attempted to send to closed WebSocket in room {room.room_name}, ignoring")
+                logger.debug("Attempted to send to closed WebSocket in room %s, ignoring", room.room_name)
             else:
                 raise
 
@@ -161,11 +249,16 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting nanosheet server")
     if GCS_BUCKET:
-        logger.info(f"GCS bucket: {GCS_BUCKET}")
+        logger.info("GCS bucket: %s", GCS_BUCKET)
         init_clients(GCS_BUCKET)
     else:
         logger.warning("YJS_GCS_BUCKET not set - persistence disabled")
 
+    if static_dir.exists():
+        load_static_cache()
+
+    writers = [asyncio.create_task(snapshot_writer()) for _ in range(SNAPSHOT_WRITERS)] if GCS_BUCKET else []
+
     # Start the WebSocket server
     async with yws:
         logger.info("WebSocket server started")
@@ -173,6 +266,9 @@ async def lifespan(app: FastAPI):
 
     # Shutdown
     logger.info("Shutting down nanosheet server")
+    for writer in writers:
+        writer.cancel()
+    await shutdown_clients()
 
 
 # Create FastAPI app
@@ -180,16 +276,17 @@ app = FastAPI(
     title="Nanosheet API",
     description="Collaborative micro-sheet backend",
     version="0.1.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # In production, restrict this
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_origins=CORS_ALLOWED_ORIGINS,
+    allow_credentials=False,
+    allow_methods=["GET", "POST", "PUT", "PATCH", "DELETE"],
+    allow_headers=["content-type", "authorization"],
 )
 
 # Custom ASGI wrapper to handle WebSocket errors gracefully
@@ -220,7 +317,7 @@ class SafeASGIServer:
                 await send(message)
             except RuntimeError as e:
                 if "after sending 'websocket.close'" in str(e) or "response already completed" in str(e):
-                    logger.debug(f"WebSocket already closed, ignoring send: {e}")
+                    logger.debug("WebSocket already closed, ignoring send: %s", e)
                 else:
                     raise
 
@@ -264,28 +361,68 @@ async def health_alt():
 
 # Mount static files
 static_dir = Path(__file__).parent / "static"
+
+# Files up to this size are served from memory; larger ones stream from disk
+STATIC_CACHE_MAX_BYTES = 64 * 1024
+
+# Paths the SPA fallback must not answer with index.html
+NON_SPA_PREFIXES = ("api/", "yjs/", "health")
+
+# Relative path -> (bytes, media type) for small files, or None for files
+# served with FileResponse. Filled at startup, so SPA routes that aren't
+# files never touch the filesystem.
+static_files = {}
+
+
+# Marks a catch-all path that isn't a static file
+NOT_STATIC = object()
+
+
+def load_static_cache():
+    """Index the static directory, reading index.html and small files into memory."""
+    static_files.clear()
+    for root, _, files in os.walk(static_dir):
+        for name in files:
+            path = Path(root) / name
+            rel_path = path.relative_to(static_dir).as_posix()
+            if rel_path == "index.html" or path.stat().st_size <= STATIC_CACHE_MAX_BYTES:
+                media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+                static_files[rel_path] = (path.read_bytes(), media_type)
+            else:
+                static_files[rel_path] = None
+    logger.info("Indexed %s static files", len(static_files))
+
+
+def index_response() -> Response:
+    """Serve the cached index.html (revalidated so new deploys are picked up)."""
+    content, media_type = static_files["index.html"]
+    return Response(content, media_type=media_type, headers={"cache-control": "no-cache"})
+
+
 if static_dir.exists():
     app.mount("/assets", StaticFiles(directory=str(static_dir / "assets")), name="assets")
 
     @app.get("/")
     async def serve_frontend():
         """Serve the frontend index.html."""
-        return FileResponse(str(static_dir / "index.html"))
+        return index_response()
 
     @app.get("/{full_path:path}")
     async def catch_all(full_path: str):
         """Catch all route to serve frontend for client-side routing."""
         # Check if it's an API or WebSocket route
-        if full_path.startswith(("api/", "yjs/", "health")):
-            return {"error": "Not found"}, 404
+        if full_path.startswith(NON_SPA_PREFIXES):
+            raise HTTPException(status_code=404, detail="Not found")
 
         # Try to serve static file
-        file_path = static_dir / full_path
-        if file_path.exists() and file_path.is_file():
-            return FileResponse(str(file_path))
+        cached = static_files.get(full_path, NOT_STATIC)
+        if cached is None:
+            return FileResponse(str(static_dir / full_path))
+        if cached is not NOT_STATIC:
+            return Response(cached[0], media_type=cached[1])
 
         # Otherwise serve index.html for SPA routing
-        return FileResponse(str(static_dir / "index.html"))
+        return index_response()
 else:
     @app.get("/")
     async def root():
@@ -68,44 +68,121 @@ class YjsSync:
             )
         """
         try:
-            # Get the room (creates if doesn't exist)
-            room_name = f"/yjs/{sheet_id}"
-            room = await self.yjs_server.get_room(room_name)
-
-            # Wait for room to be ready
-            if not room.ready:
-                await room.start()
+            # Get the room (creates and starts it if needed)
+            room = await self.yjs_server.get_room_by_id(sheet_id)
 
             # Get cardsMetadata map
-            cards_metadata = room.ydoc.get_map('cardsMetadata')
+            cards_metadata = room.cards_metadata
+
+            # A new card's map is filled before the transaction opens
+            card_map = self._card_map_for(cards_metadata, card_id, card_data)
 
             # Use a transaction to batch all operations
             with room.ydoc.begin_transaction() as txn:
-                # Check if card already exists
-                existing_card = cards_metadata.get(card_id)
-
-                if existing_card and isinstance(existing_card, YMap):
-                    # Update existing nested Y.Map
-                    for key, value in card_data.items():
-                        existing_card.set(txn, key, value)
-                    logger.debug(f"Updated existing card {card_id} in {sheet_id}")
-                else:
-                    # Create new standalone nested Y.Map
-                    card_map = YMap()
-                    for key, value in card_data.items():
-                        card_map[key] = value
+                self._upsert_card(cards_metadata, txn, sheet_id, card_id, card_data, card_map)
 
-                    # Store in cardsMetadata (this integrates it into the doc)
-                    cards_metadata.set(txn, card_id, card_map)
-                    logger.debug(f"Created new card {card_id} in {sheet_id}")
+            logger.info("Synced card %s to Yjs sheet %s", card_id, sheet_id)
+            return True
+
+        except Exception as e:
+            logger.error("Failed to sync card %s to Yjs sheet %s: %s", card_id, sheet_id, e)
+            return False
+
+    async def sync_cards_to_sheet(
+        self,
+        sheet_id: str,
+        cards: dict
+    ) -> bool:
+        """
+        Sync many cards to a sheet's Yjs document in a single transaction.
+
+        Same per-card behavior as sync_card_to_sheet, but the room is looked
+        up once and clients (and the snapshot writer) see one update for
+        the whole batch instead of one per card.
+
+        Args:
+            sheet_id: Sheet/room identifier
+            cards: Mapping of card_id to plain card dict (see sync_card_to_sheet)
 
-            logger.info(f"Synced card {card_id} to Yjs sheet {sheet_id}")
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            room = await self.yjs_server.get_room_by_id(sheet_id)
+
+            cards_metadata = room.cards_metadata
+
+            # New cards' maps are filled before the transaction opens
+            card_maps = {
+                card_id: self._card_map_for(cards_metadata, card_id, card_data)
+                for card_id, card_data in cards.items()
+            }
+
+            with room.ydoc.begin_transaction() as txn:
+                for card_id, card_data in cards.items():
+                    self._upsert_card(cards_metadata, txn, sheet_id, card_id, card_data, card_maps[card_id])
+
+            logger.info("Synced %s cards to Yjs sheet %s", len(cards), sheet_id)
             return True
 
         except Exception as e:
-            logger.error(f"Failed to sync card {card_id} to Yjs sheet {sheet_id}: {e}")
+            logger.error("Failed to sync %s cards to Yjs sheet %s: %s", len(cards), sheet_id, e)
             return False
 
+    def _card_map_for(
+        self,
+        cards_metadata: YMap,
+        card_id: str,
+        card_data: dict
+    ) -> YMap:
+        """
+        Return a card's existing Y.Map, or a new prelim Y.Map holding card_data.
+
+        Call before opening the transaction: a prelim map is plain data until
+        it is integrated, so filling it there keeps the transaction to a
+        single set.
+
+        Args:
+            cards_metadata: The room's cardsMetadata map
+            card_id: Unique card identifier
+            card_data: Plain dict with card fields
+
+        Returns:
+            YMap: The integrated card map, or a prelim map for a new card
+        """
+        existing_card = cards_metadata.get(card_id)
+        return existing_card if existing_card is not None else YMap(card_data)
+
+    def _upsert_card(
+        self,
+        cards_metadata: YMap,
+        txn,
+        sheet_id: str,
+        card_id: str,
+        card_data: dict,
+        card_map: YMap
+    ):
+        """
+        Create or update one card's nested Y.Map within txn.
+
+        Args:
+            cards_metadata: The room's cardsMetadata map
+            txn: Open transaction on the room's YDoc
+            sheet_id: Sheet/room identifier (for logging)
+            card_id: Unique card identifier
+            card_data: Plain dict with card fields
+            card_map: Map from _card_map_for
+        """
+        if card_map.prelim:
+            # Store in cardsMetadata (this integrates it into the doc)
+            cards_metadata.set(txn, card_id, card_map)
+            logger.debug("Created new card %s in %s", card_id, sheet_id)
+        else:
+            # Update existing nested Y.Map
+            for key, value in card_data.items():
+                card_map.set(txn, key, value)
+            logger.debug("Updated existing card %s in %s", card_id, sheet_id)
+
     async def remove_card_from_sheet(
         self,
         sheet_id: str,
@@ -125,25 +202,21 @@ class YjsSync:
             True if successful, False otherwise
         """
         try:
-            room_name = f"/yjs/{sheet_id}"
-            room = await self.yjs_server.get_room(room_name)
+            room = await self.yjs_server.get_room_by_id(sheet_id)
 
-            if not room.ready:
-                await room.start()
-
-            cards_metadata = room.ydoc.get_map('cardsMetadata')
+            cards_metadata = room.cards_metadata
 
             with room.ydoc.begin_transaction() as txn:
-                if card_id in cards_metadata:
+                if cards_metadata.get(card_id) is not None:
                     cards_metadata.pop(txn, card_id)
-                    logger.info(f"Removed card {card_id} from Yjs sheet {sheet_id}")
+                    logger.info("Removed card %s from Yjs sheet %s", card_id, sheet_id)
                 else:
-                    logger.warning(f"Card {card_id} not found in Yjs sheet {sheet_id}")
+                    logger.warning("Card %s not found in Yjs sheet %s", card_id, sheet_id)
 
             return True
 
         except Exception as e:
-            logger.error(f"Failed to remove card {card_id} from Yjs sheet {sheet_id}: {e}")
+            logger.error("Failed to remove card %s from Yjs sheet %s: %s", card_id, sheet_id, e)
             return False
 
     async def set_card_field(
@@ -167,37 +240,80 @@ class YjsSync:
             True if successful, False otherwise
         """
         try:
-            room_name = f"/yjs/{sheet_id}"
-            room = await self.yjs_server.get_room(room_name)
-
-            if not room.ready:
-                await room.start()
+            room = await self.yjs_server.get_room_by_id(sheet_id)
 
-            cards_metadata = room.ydoc.get_map('cardsMetadata')
+            cards_metadata = room.cards_metadata
 
             with room.ydoc.begin_transaction() as txn:
                 # Get or create the card map
-                if card_id not in cards_metadata:
+                card_map = cards_metadata.get(card_id)
+                if card_map is None:
                     card_map = room.ydoc.get_map(f"card_{card_id}")
                     cards_metadata.set(txn, card_id, card_map)
-                else:
-                    card_map = cards_metadata[card_id]
 
                 # Set or delete the field
                 if value is None:
                     # Delete the field if value is None
                     if field in card_map:
                         card_map.pop(txn, field)
-                        logger.debug(f"Deleted field {field} from card {card_id}")
+                        logger.debug("Deleted field %s from card %s", field, card_id)
                 else:
                     # Set the field value
                     card_map.set(txn, field, value)
-                    logger.debug(f"Set field {field} on card {card_id} to {value}")
+                    logger.debug("Set field %s on card %s to %s", field, card_id, value)
+
+            return True
+
+        except Exception as e:
+            logger.error("Failed to set field %s on card %s in sheet %s: %s", field, card_id, sheet_id, e)
+            return False
+
+    async def set_card_fields(
+        self,
+        sheet_id: str,
+        card_id: str,
+        fields: dict
+    ) -> bool:
+        """
+        Set several fields on a card in a single Yjs transaction.
+        Fields whose value is None are deleted from the card map.
+
+        Clients receive one update for the whole batch instead of one per
+        field, as they would from repeated set_card_field calls.
+
+        Args:
+            sheet_id: Sheet/room identifier
+            card_id: Card ID to update
+            fields: Mapping of field name to value (None to delete)
+
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            room = await self.yjs_server.get_room_by_id(sheet_id)
+
+            cards_metadata = room.cards_metadata
+
+            with room.ydoc.begin_transaction() as txn:
+                # Get or create the card map
+                card_map = cards_metadata.get(card_id)
+                if card_map is None:
+                    card_map = room.ydoc.get_map(f"card_{card_id}")
+                    cards_metadata.set(txn, card_id, card_map)
 
+                for field, value in fields.items():
+                    if value is None:
+                        if field in card_map:
+                            card_map.pop(txn, field)
+                    else:
+                        card_map.set(txn, field, value)
+
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Set fields %s on card %s", list(fields), card_id)
             return True
 
         except Exception as e:
-            logger.error(f"Failed to set field {field} on card {card_id} in sheet {sheet_id}: {e}")
+            logger.error("Failed to set fields on card %s in sheet %s: %s", card_id, sheet_id, e)
             return False
 
     async def sync_cell_to_sheet(
@@ -239,31 +355,27 @@ class YjsSync:
             )
         """
         try:
-            room_name = f"/yjs/{sheet_id}"
-            room = await self.yjs_server.get_room(room_name)
-
-            if not room.ready:
-                await room.start()
+            room = await self.yjs_server.get_room_by_id(sheet_id)
 
-            cells = room.ydoc.get_map('cells')
+            cells = room.cells
             cell_key = f"{row_id}:{col_id}"
 
             with room.ydoc.begin_transaction() as txn:
                 if card_id is None:
                     # Clear cell
-                    if cell_key in cells:
+                    if cells.get(cell_key) is not None:
                         cells.pop(txn, cell_key)
-                        logger.debug(f"Cleared cell {cell_key} in {sheet_id}")
+                        logger.debug("Cleared cell %s in %s", cell_key, sheet_id)
                 else:
                     # Assign card to cell
                     cells.set(txn, cell_key, {"cardId": card_id})
-                    logger.debug(f"Assigned card {card_id} to cell {cell_key} in {sheet_id}")
+                    logger.debug("Assigned card %s to cell %s in %s", card_id, cell_key, sheet_id)
 
-            logger.info(f"Synced cell {cell_key} in Yjs sheet {sheet_id}")
+            logger.info("Synced cell %s in Yjs sheet %s", cell_key, sheet_id)
             return True
 
         except Exception as e:
-            logger.error(f"Failed to sync cell {cell_key} in Yjs sheet {sheet_id}: {e}")
+            logger.error("Failed to sync cell %s in Yjs sheet %s: %s", cell_key, sheet_id, e)
             return False
 
     async def add_row_to_sheet(
@@ -284,13 +396,9 @@ class YjsSync:
             True if successful, False otherwise
         """
         try:
-            room_name = f"/yjs/{sheet_id}"
-            room = await self.yjs_server.get_room(room_name)
+            room = await self.yjs_server.get_room_by_id(sheet_id)
 
-            if not room.ready:
-                await room.start()
-
-            row_order = room.ydoc.get_array('rowOrder')
+            row_order = room.row_order
 
             with room.ydoc.begin_transaction() as txn:
                 if position is None:
@@ -298,11 +406,11 @@ class YjsSync:
                 else:
                     row_order.insert(txn, position, row_id)
 
-            logger.info(f"Added row {row_id} to Yjs sheet {sheet_id}")
+            logger.info("Added row %s to Yjs sheet %s", row_id, sheet_id)
             return True
 
         except Exception as e:
-            logger.error(f"Failed to add row {row_id} to Yjs sheet {sheet_id}: {e}")
+            logger.error("Failed to add row %s to Yjs sheet %s: %s", row_id, sheet_id, e)
             return False
 
     async def add_column_to_sheet(
@@ -323,13 +431,9 @@ class YjsSync:
             True if successful, False otherwise
         """
         try:
-            room_name = f"/yjs/{sheet_id}"
-            room = await self.yjs_server.get_room(room_name)
-
-            if not room.ready:
-                await room.start()
+            room = await self.yjs_server.get_room_by_id(sheet_id)
 
-            col_order = room.ydoc.get_array('colOrder')
+            col_order = room.col_order
 
             with room.ydoc.begin_transaction() as txn:
                 if position is None:
@@ -337,11 +441,11 @@ class YjsSync:
                 else:
                     col_order.insert(txn, position, col_id)
 
-            logger.info(f"Added column {col_id} to Yjs sheet {sheet_id}")
+            logger.info("Added column %s to Yjs sheet %s", col_id, sheet_id)
             return True
 
         except Exception as e:
-            logger.error(f"Failed to add column {col_id} to Yjs sheet {sheet_id}: {e}")
+            logger.error("Failed to add column %s to Yjs sheet %s: %s", col_id, sheet_id, e)
             return False
 
     async def insert_card_at_front_of_lane(
@@ -365,59 +469,154 @@ class YjsSync:
             True if successful, False otherwise
         """
         try:
-            room_name = f"/yjs/{sheet_id}"
-            room = await self.yjs_server.get_room(room_name)
-
-            if not room.ready:
-                await room.start()
+            # A loaded room's rows are known, so reject out-of-range inserts
+            # up front; a cold room must load its snapshot first, and
+            # _insert_in_lane bounds-checks against the loaded rows
+            if self.yjs_server.is_room_loaded(sheet_id):
+                target_position = 1 + position_offset
+                num_rows = self._row_count(sheet_id)
+                if target_position >= num_rows:
+                    logger.warning("Target position %s out of bounds (sheet has %s rows)", target_position, num_rows)
+                    return False
 
-            cells = room.ydoc.get_map('cells')
-            row_order = room.ydoc.get_array('rowOrder')
+            room = await self.yjs_server.get_room_by_id(sheet_id)
 
             with room.ydoc.begin_transaction() as txn:
-                # Get all row IDs (timeline)
-                rows = list(row_order)
+                return self._insert_in_lane(room, txn, sheet_id, lane_id, card_id, position_offset)
 
-                if len(rows) == 0:
-                    logger.warning(f"No rows found in sheet {sheet_id}")
-                    return False
+        except Exception as e:
+            # exc_info renders the traceback only if the record is emitted
+            logger.error("Failed to insert card at position %s in lane %s in sheet %s: %s", 1 + position_offset, lane_id, sheet_id, e, exc_info=True)
+            return False
 
-                # Target position (1 = first data row, 2 = second, etc.)
-                target_position = 1 + position_offset
+    async def create_and_place_card(
+        self,
+        sheet_id: str,
+        card_id: str,
+        lane_id: str,
+        position_offset: int,
+        card_data: dict
+    ) -> bool:
+        """
+        Create a card and insert it at the front of a lane in one transaction.
 
-                if target_position >= len(rows):
-                    logger.warning(f"Target position {target_position} out of bounds (sheet has {len(rows)} rows)")
-                    return False
+        Equivalent to sync_card_to_sheet followed by insert_card_at_front_of_lane,
+        but clients receive a single update for both changes.
 
-                # Collect all existing cards in this lane starting from target position
-                existing_cards = []
-                for i in range(target_position, len(rows)):
-                    row_id = rows[i]
-                    cell_key = f"{row_id}:{lane_id}"
-                    cell = cells.get(cell_key)
-                    if cell and isinstance(cell, dict) and 'cardId' in cell:
-                        existing_cards.append((i, cell))
-
-                # Shift all existing cards down by 1 position
-                # Work backwards to avoid overwriting
-                for i, cell in reversed(existing_cards):
-                    old_key = f"{rows[i]}:{lane_id}"
-                    new_key = f"{rows[i + 1]}:{lane_id}"
-
-                    # Move card to next position
-                    cells.pop(txn, old_key)
-                    cells.set(txn, new_key, cell)
-
-                # Insert new card at target position
-                target_row = rows[target_position]
-                new_cell_key = f"{target_row}:{lane_id}"
-                cells.set(txn, new_cell_key, {"cardId": card_id})
-                logger.info(f"Inserted card {card_id} at position {target_position} in lane {lane_id} (shifted {len(existing_cards)} cards down)")
+        Args:
+            sheet_id: Sheet/room identifier
+            card_id: Card ID to create and insert
+            lane_id: Lane (column in vertical mode) identifier
+            position_offset: Offset from position 1 (for batch uploads to maintain order)
+            card_data: Plain dict with card fields (see sync_card_to_sheet)
 
-            return True
+        Returns:
+            True if the card was created and placed, False otherwise
+        """
+        try:
+            room = await self.yjs_server.get_room_by_id(sheet_id)
+
+            cards_metadata = room.cards_metadata
+
+            # Filled as prelim data before the transaction opens
+            card_map = YMap(card_data)
+
+            with room.ydoc.begin_transaction() as txn:
+                cards_metadata.set(txn, card_id, card_map)
+
+                placed = self._insert_in_lane(room, txn, sheet_id, lane_id, card_id, position_offset)
+
+            logger.info("Created card %s in Yjs sheet %s (placed=%s)", card_id, sheet_id, placed)
+            return placed
 
         except Exception as e:
-            logger.error(f"Failed to insert card at position {1 + position_offset} in lane {lane_id} in sheet {sheet_id}: {e}")
-            import traceback
-            logger.error(f"Traceback: {traceback.format_exc()}")
+            logger.error("Failed to create and place card %s in lane %s in sheet %s: %s", card_id, lane_id, sheet_id, e)
+            return False
+
+    def _row_count(self, sheet_id: str) -> int:
+        """
+        Return the number of rows in a sheet's loaded room without creating it.
+        """
+        room = self.yjs_server.rooms.get(sheet_id)
+        return len(room.row_order) if room is not None else 0
+
+    def _insert_in_lane(
+        self,
+        room,
+        txn,
+        sheet_id: str,
+        lane_id: str,
+        card_id: str,
+        position_offset: int
+    ) -> bool:
+        """
+        Shift a lane down and place a card at position 1 + offset within txn.
+
+        Args:
+            room: The sheet's room
+            txn: Open transaction on the room's YDoc
+            sheet_id: Sheet/room identifier (for logging)
+            lane_id: Lane (column in vertical mode) identifier
+            card_id: Card ID to insert
+            position_offset: Offset from position 1
+
+        Returns:
+            True if the card was placed, False if the position is out of bounds
+        """
+        cells = room.cells
+        row_order = room.row_order
+
+        num_rows = len(row_order)
+
+        if num_rows == 0:
+            logger.warning("No rows found in sheet %s", sheet_id)
+            return False
+
+        # Target position (1 = first data row, 2 = second, etc.)
+        target_position = 1 + position_offset
+
+        if target_position >= num_rows:
+            logger.warning("Target position %s out of bounds (sheet has %s rows)", target_position, num_rows)
+            return False
+
+        # Only rows from the target down are involved; slice just that suffix
+        # of the timeline (rows[j] is row target_position + j)
+        rows = row_order[target_position:]
+
+        # Collect all existing cards in this lane starting from target position;
+        # the room's lane index means only occupied cells are read from the map
+        lane_rows = room.lane_rows.get(lane_id, ())
+        existing_cards = []
+        if lane_rows:
+            for j, row_id in enumerate(rows):
+                if row_id not in lane_rows:
+                    continue
+                cell = cells.get(f"{row_id}:{lane_id}")
+                if cell is not None and 'cardId' in cell:
+                    existing_cards.append((j, cell))
+
+        if existing_cards and existing_cards[-1][0] + 1 >= len(rows):
+            logger.warning("Lane %s has a card in the last row; no room to shift it down", lane_id)
             return False
+
+        # Plan the shift up front: every card moves down one row. A cell
+        # that receives a card is overwritten by its set, so only cells
+        # left empty afterwards need a pop.
+        new_cell_key = f"{rows[0]}:{lane_id}"
+        moves = [(f"{rows[j + 1]}:{lane_id}", cell) for j, cell in existing_cards]
+        vacated = {f"{rows[j]}:{lane_id}" for j, _ in existing_cards}
+        vacated.difference_update(new_key for new_key, _ in moves)
+        vacated.discard(new_cell_key)
+
+        cells_pop = cells.pop
+        cells_set = cells.set
+        for old_key in vacated:
+            cells_pop(txn, old_key)
+        for new_key, cell in moves:
+            cells_set(txn, new_key, cell)
+
+        # Insert new card at target position
+        cells_set(txn, new_cell_key, {"cardId": card_id})
+        logger.info("Inserted card %s at position %s in lane %s (shifted %s cards down)", card_id, target_position, lane_id, len(existing_cards))
+
+        return True